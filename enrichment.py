@@ -1,16 +1,30 @@
-import requests
 from datetime import datetime
 import logging
 import json
 import time
 import os
-from mlb_http import get_json
+from mlb_http import get_json, HTTP2
+from universal_cache import ExpiringMemo
 
 # --- NEW: MLB player-id resolver (cached) ---
 from functools import lru_cache
+import atexit
 import httpx
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# One pooled client for the resolver so cache misses reuse keep-alive
+# connections instead of paying a new TLS handshake per name.
+_HTTPX = httpx.Client(
+    http2=HTTP2, timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+atexit.register(_HTTPX.close)
+
 def _normalize_name(name: str) -> str:
     # "Mookie Betts" -> "mookie betts"
     return re.sub(r"\s+", " ", (name or "").strip()).lower()
@@ -27,18 +41,17 @@ def _mlb_player_id_cache(norm_name: str):
     url = "https://statsapi.mlb.com/api/v1/people/search"
     params = {"names": norm_name}
     try:
-        with httpx.Client(timeout=10) as client:
-            resp = client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json() or {}
-            people = data.get("people") or []
-            # Try exact match on normalized full name; else first result.
-            for p in people:
-                full = _normalize_name(p.get("fullName", ""))
-                if full == norm_name and p.get("id"):
-                    return str(p["id"])
-            if people and people[0].get("id"):
-                return str(people[0]["id"])
+        resp = _HTTPX.get(url, params=params)
+        resp.raise_for_status()
+        data = resp.json() or {}
+        people = data.get("people") or []
+        # Try exact match on normalized full name; else first result.
+        for p in people:
+            full = _normalize_name(p.get("fullName", ""))
+            if full == norm_name and p.get("id"):
+                return str(p["id"])
+        if people and people[0].get("id"):
+            return str(people[0]["id"])
     except Exception:
         # Keep silent; resolver is best-effort.
         return None
@@ -50,6 +63,17 @@ def resolve_mlb_player_id(full_name: str):
 
 logger = logging.getLogger(__name__)
 
+# Per-prop cache/skip chatter is off unless ENRICH_VERBOSE=1
+VERBOSE = os.getenv("ENRICH_VERBOSE", "0") == "1"
+
+@lru_cache(maxsize=1)
+def _season_for_hour(hour_bucket: int) -> str:
+    return str(datetime.utcnow().year)
+
+def _current_season() -> str:
+    """Current MLB season as a string; recomputed at most once per hour."""
+    return _season_for_hour(int(time.time() // 3600))
+
 def _safe_init_fair(row: dict) -> None:
     row.setdefault("fair", {})
     row["fair"].setdefault("book", "")
@@ -76,16 +100,17 @@ def load_park_factors():
         with open("park_factors.json", "r") as f:
             return json.load(f)
     except Exception as e:
-        logger.warning(f"Failed to load park factors: {e}")
+        logger.warning("Failed to load park factors: %s", e)
         return {}
 
-def apply_park_factor(prop, stadium_name):
-    """Apply park factor multiplier based on stadium and stat type"""
+@lru_cache(maxsize=512)
+def apply_park_factor(stat_type, stadium_name):
+    """Apply park factor multiplier based on stadium and stat type (memoized per pair)"""
     try:
         park_factors = load_park_factors()
         factors = park_factors.get(stadium_name, {})
         
-        stat_type = prop.get("stat_type", "").lower()
+        stat_type = (stat_type or "").lower()
         
         if "home_runs" in stat_type or "hr" in stat_type:
             return factors.get("hr_factor", 1.0)
@@ -98,18 +123,22 @@ def apply_park_factor(prop, stadium_name):
         
         return 1.0
     except Exception as e:
-        logger.debug(f"Park factor error for {stadium_name}: {e}")
+        logger.debug("Park factor error for %s: %s", stadium_name, e)
         return 1.0
 
 # Enhanced Enrichment: Recent Player Form
+FORM_TTL = 300  # seconds a form multiplier is reused across props
+
 def get_recent_form_multiplier(player_id, stat_type):
     """Calculate recent form multiplier based on last 5 games vs season average"""
+    return _recent_form_for_bucket(player_id, stat_type, int(time.time() // FORM_TTL))
+
+@lru_cache(maxsize=4096)
+def _recent_form_for_bucket(player_id, stat_type, bucket):
+    # bucket only keys the cache: entries go stale after FORM_TTL
     try:
-        data = get_json(f"people/{player_id}/stats", {
-            "stats": "gameLog",
-            "season": str(datetime.utcnow().year),
-            "group": "hitting" if "batter_" in stat_type else "pitching"
-        })
+        data = get_json(f"people/{player_id}/stats",
+                        _gamelog_params(_current_season(), _stat_group(stat_type)))
         stats = data.get("stats", [])
         if not stats:
             return 1.0
@@ -151,41 +180,43 @@ def get_recent_form_multiplier(player_id, stat_type):
         return 1.0
         
     except Exception as e:
-        logger.debug(f"Recent form error for player {player_id}: {e}")
+        logger.debug("Recent form error for player %s: %s", player_id, e)
         return 1.0
 
 # Enhanced Enrichment: Bullpen Fatigue Context
+# This is a simplified version - in production you'd call MLB API for actual bullpen data
+HIGH_USAGE_TEAMS = frozenset(["Red Sox", "Royals", "Angels", "White Sox", "Rockies"])
+
+@lru_cache(maxsize=2048)
 def get_bullpen_fatigue_multiplier(team_name):
     """Analyze bullpen usage over past 3 games"""
     try:
-        # This is a simplified version - in production you'd call MLB API for actual bullpen data
-        high_usage_teams = ["Red Sox", "Royals", "Angels", "White Sox", "Rockies"]
-        
-        if team_name in high_usage_teams:
+        if team_name in HIGH_USAGE_TEAMS:
             return 1.05  # 5% boost for hitting props against fatigued bullpens
         return 1.0
         
     except Exception as e:
-        logger.debug(f"Bullpen fatigue error for {team_name}: {e}")
+        logger.debug("Bullpen fatigue error for %s: %s", team_name, e)
         return 1.0
 
 # Enhanced Enrichment: Lineup Position Influence  
+# Simplified - would integrate with actual lineup data in production
+TOP_ORDER_PLAYERS = frozenset(["Mookie Betts", "Aaron Judge", "Juan Soto", "Freddie Freeman"])
+BOTTOM_ORDER_PLAYERS = frozenset(["Kyle Higashioka", "Nick Ahmed", "Jake Meyers"])
+
+@lru_cache(maxsize=2048)
 def get_lineup_position_multiplier(player_name):
     """Apply multiplier based on typical lineup position"""
     try:
-        # Simplified - would integrate with actual lineup data in production
-        top_order_players = ["Mookie Betts", "Aaron Judge", "Juan Soto", "Freddie Freeman"]
-        bottom_order_players = ["Kyle Higashioka", "Nick Ahmed", "Jake Meyers"]
-        
-        if player_name in top_order_players:
+        if player_name in TOP_ORDER_PLAYERS:
             return 1.08  # 8% boost for 1-4 hitters
-        elif player_name in bottom_order_players:
+        elif player_name in BOTTOM_ORDER_PLAYERS:
             return 0.95  # 5% reduction for 7-9 hitters
         
         return 1.0
         
     except Exception as e:
-        logger.debug(f"Lineup position error for {player_name}: {e}")
+        logger.debug("Lineup position error for %s: %s", player_name, e)
         return 1.0
 
 MLB_STATS_API = "https://statsapi.mlb.com/api/v1"
@@ -199,7 +230,8 @@ def cache_props_to_file(props, filename="mlb_props_cache.json"):
         
         with open(filename, "w") as f:
             json.dump(props, f)
-        print(f"[CACHE] Props saved to {filename} ✅")
+        if VERBOSE:
+            print(f"[CACHE] Props saved to {filename} ✅")
         return True
     except Exception as e:
         print(f"[CACHE ERROR] Failed to write cache: {e}")
@@ -210,7 +242,8 @@ def load_props_from_file(filename="mlb_props_cache.json"):
     try:
         with open(filename, "r") as f:
             props = json.load(f)
-        print(f"[CACHE] Loaded {len(props)} props from {filename}")
+        if VERBOSE:
+            print(f"[CACHE] Loaded {len(props)} props from {filename}")
         
         # Attach player_ids for MLB props
         league = "mlb" if "mlb" in filename.lower() else "nfl"
@@ -218,7 +251,8 @@ def load_props_from_file(filename="mlb_props_cache.json"):
         
         return props
     except FileNotFoundError:
-        print(f"[CACHE] No cache file found: {filename}")
+        if VERBOSE:
+            print(f"[CACHE] No cache file found: {filename}")
         return []
     except Exception as e:
         print(f"[CACHE ERROR] Failed to load cache: {e}")
@@ -229,6 +263,23 @@ player_id_cache = {}
 player_context_cache = {}
 cache_timeout = 3600  # 1 hour cache timeout
 
+# None/failed lookups expire after neg_ttl so one bad name or a statsapi
+# timeout isn't retried on every prop for that player.
+_lookup_cache = ExpiringMemo(maxsize=8192)
+
+def cached_or_none(fn, key, pos_ttl=300, neg_ttl=60):
+    """Return fn() memoized under key; None and exceptions are cached for neg_ttl."""
+    now = time.time()
+    hit = _lookup_cache.get(key, now)
+    if hit is not None:
+        return hit[0]
+    try:
+        value = fn()
+    except Exception as e:
+        logger.debug("Lookup %s failed: %s", key, e)
+        value = None
+    return _lookup_cache.put(key, value, now + (pos_ttl if value is not None else neg_ttl))
+
 def get_player_id(player_name):
     """Get MLB player ID from name with caching"""
     # Check cache first
@@ -252,7 +303,7 @@ def get_player_id(player_name):
         
         return player_id
     except Exception as e:
-        logger.error(f"Error fetching player ID for {player_name}: {e}")
+        logger.error("Error fetching player ID for %s: %s", player_name, e)
         return None
 
 def get_opponent_context(player_id):
@@ -294,39 +345,50 @@ def get_opponent_context(player_id):
     except Exception:
         return None
 
+# Prop bet stat types -> MLB Stats API field names
+_STAT_MAP = {
+    # Batting stats
+    "batter_hits": "hits",
+    "batter_rbi": "rbi", 
+    "batter_runs": "runs",
+    "batter_home_runs": "homeRuns",
+    "batter_total_bases": "totalBases",
+    "batter_stolen_bases": "stolenBases",
+    "batter_walks": "baseOnBalls",
+    "batter_strikeouts": "strikeOuts",
+    "batter_hits_runs_rbis": "hits_runs_rbis",  # Custom calculation
+    "batter_fantasy_score": "fantasy_score",  # Custom calculation
+    
+    # Pitching stats
+    "pitcher_strikeouts": "strikeOuts",
+    "pitcher_hits_allowed": "hits",
+    "pitcher_earned_runs": "earnedRuns",
+    "pitcher_walks": "baseOnBalls",
+    "pitcher_outs": "outs",
+    
+    # Legacy mappings
+    "hits": "hits",
+    "rbi": "rbi",
+    "runs": "runs",
+    "homeRuns": "homeRuns",
+    "totalBases": "totalBases",
+    "stolenBases": "stolenBases",
+    "strikeOuts": "strikeOuts",
+    "baseOnBalls": "baseOnBalls"
+}
+
+def _stat_group(stat_type):
+    """StatsAPI stats group for a stat type (one source of truth for gameLog calls)"""
+    return "pitching" if stat_type.startswith("pitcher_") else "hitting"
+
+@lru_cache(maxsize=64)
+def _gamelog_params(season, group):
+    """Shared gameLog params per (season, group); callers must not mutate it."""
+    return {"stats": "gameLog", "season": season, "group": group}
+
 def get_stat_mapping(stat_type):
     """Map prop bet stat types to MLB Stats API field names"""
-    mapping = {
-        # Batting stats
-        "batter_hits": "hits",
-        "batter_rbi": "rbi", 
-        "batter_runs": "runs",
-        "batter_home_runs": "homeRuns",
-        "batter_total_bases": "totalBases",
-        "batter_stolen_bases": "stolenBases",
-        "batter_walks": "baseOnBalls",
-        "batter_strikeouts": "strikeOuts",
-        "batter_hits_runs_rbis": "hits_runs_rbis",  # Custom calculation
-        "batter_fantasy_score": "fantasy_score",  # Custom calculation
-        
-        # Pitching stats
-        "pitcher_strikeouts": "strikeOuts",
-        "pitcher_hits_allowed": "hits",
-        "pitcher_earned_runs": "earnedRuns",
-        "pitcher_walks": "baseOnBalls",
-        "pitcher_outs": "outs",
-        
-        # Legacy mappings
-        "hits": "hits",
-        "rbi": "rbi",
-        "runs": "runs",
-        "homeRuns": "homeRuns",
-        "totalBases": "totalBases",
-        "stolenBases": "stolenBases",
-        "strikeOuts": "strikeOuts",
-        "baseOnBalls": "baseOnBalls"
-    }
-    return mapping.get(stat_type, stat_type)
+    return _STAT_MAP.get(stat_type, stat_type)
 
 def calculate_custom_stat(game_data, stat_type):
     """Calculate custom composite stats"""
@@ -407,7 +469,7 @@ def get_fallback_hit_rate(player_name, stat_type, threshold):
             "note": "Fallback calculation - limited data available"
         }
     except Exception as e:
-        logger.error(f"Error in fallback hit rate calculation: {e}")
+        logger.error("Error in fallback hit rate calculation: %s", e)
         return {
             "player": player_name,
             "stat": stat_type,
@@ -421,7 +483,7 @@ def get_fallback_hit_rate(player_name, stat_type, threshold):
 def get_contextual_hit_rate(player_name, stat_type, threshold=1):
     """Get contextual hit rate with comprehensive stat type support and fallback calculations"""
     try:
-        season = str(datetime.utcnow().year)
+        season = _current_season()
         player_id = get_player_id(player_name)
         if not player_id:
             return get_fallback_hit_rate(player_name, stat_type, threshold)
@@ -432,10 +494,9 @@ def get_contextual_hit_rate(player_name, stat_type, threshold=1):
             team_id, opponent_id, pitcher_hand = context
 
         # fetch logs (same as before but use computed season)
-        logs = get_json(f"people/{player_id}/stats", {
-            "stats": "gameLog", "season": season,
-            "group": "pitching" if stat_type.startswith("pitcher_") else "hitting"
-        }).get("stats", [{}])[0].get("splits", [])
+        logs = get_json(f"people/{player_id}/stats",
+                        _gamelog_params(season, _stat_group(stat_type))
+                        ).get("stats", [{}])[0].get("splits", [])
 
         # sample selection:
         if opponent_id:
@@ -452,17 +513,16 @@ def get_contextual_hit_rate(player_name, stat_type, threshold=1):
         # map stat key
         stat_key = get_stat_mapping(stat_type)
 
-        # value extractor (handles custom stats)
-        def game_value(g):
-            s = g.get("stat", {})
-            if stat_key == "hits_runs_rbis":
-                return (s.get("hits", 0) + s.get("runs", 0) + s.get("rbi", 0))
-            elif stat_key == "fantasy_score":
-                from fantasy import calculate_fantasy_points
-                return calculate_fantasy_points(s)
-            return s.get(stat_key, 0)
-
-        over = sum(1 for g in filtered if game_value(g) >= float(threshold))
+        # value extractor (handles custom stats); chosen once, not per game
+        if stat_key == "hits_runs_rbis":
+            stat_value = lambda s: s.get("hits", 0) + s.get("runs", 0) + s.get("rbi", 0)
+        elif stat_key == "fantasy_score":
+            from fantasy import calculate_fantasy_points as stat_value
+        else:
+            stat_value = lambda s: s.get(stat_key, 0)
+
+        t = float(threshold)
+        over = sum(1 for g in filtered if stat_value(g.get("stat", {})) >= t)
         hit_rate = round(over / len(filtered), 4)
 
         return {
@@ -475,11 +535,11 @@ def get_contextual_hit_rate(player_name, stat_type, threshold=1):
             "opponent_id": opponent_id,
             "confidence": get_confidence_level(hit_rate, len(filtered))
         }
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching contextual hit rate for {player_name}: {e}")
+    except httpx.HTTPError as e:
+        logger.error("Error fetching contextual hit rate for %s: %s", player_name, e)
         return get_fallback_hit_rate(player_name, stat_type, threshold)
     except Exception as e:
-        logger.error(f"Unexpected error in contextual hit rate for {player_name}: {e}")
+        logger.error("Unexpected error in contextual hit rate for %s: %s", player_name, e)
         return get_fallback_hit_rate(player_name, stat_type, threshold)
 
 def get_fantasy_hit_rate(player_name, threshold=6):
@@ -491,20 +551,18 @@ def get_fantasy_hit_rate(player_name, threshold=6):
         
         player_id = get_player_id(player_name)
         if not player_id:
-            print(f"[SKIP] Player ID not found for {player_name}")
+            if VERBOSE:
+                print(f"[SKIP] Player ID not found for {player_name}")
             return get_fallback_hit_rate(player_name, "fantasy_score", threshold)
 
         # Get game logs safely
-        logs_data = get_json(f"people/{player_id}/stats", {
-            "stats": "gameLog",
-            "season": str(datetime.utcnow().year),
-            "group": "hitting"
-        })
+        logs_data = get_json(f"people/{player_id}/stats", _gamelog_params(_current_season(), "hitting"))
         
         # Safe stats access
         stats_array = logs_data.get("stats", [])
         if not stats_array:
-            print(f"[SKIP] No stats data for {player_name}")
+            if VERBOSE:
+                print(f"[SKIP] No stats data for {player_name}")
             return get_fallback_hit_rate(player_name, "fantasy_score", threshold)
         
         logs = stats_array[0].get("splits", [])
@@ -527,14 +585,27 @@ def get_fantasy_hit_rate(player_name, threshold=6):
             
     except Exception as e:
         print(f"[ERROR] Fantasy enrichment failed for {player_name}: {e}")
-        logger.error(f"Fantasy hit rate error for {player_name}: {e}")
+        logger.error("Fantasy hit rate error for %s: %s", player_name, e)
         return get_fallback_hit_rate(player_name, "fantasy_score", threshold)
 
+def _write_json_file(path, data):
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data))
+    else:
+        with open(path, "w") as f:
+            json.dump(data, f)
+
 def get_player_team_mapping():
-    """Get current MLB player-to-team mapping"""
+    """
+    Get current MLB player-to-team mapping.
+    On refresh only rosters whose team `lastUpdated` moved are re-fetched;
+    the rest are reused from the cached per-team rosters.
+    """
     try:
         # Try to load cached mapping first
         cache_file = "player_team_cache.json"
+        cached_data = {}
         try:
             with open(cache_file, "r") as f:
                 cached_data = json.load(f)
@@ -545,45 +616,63 @@ def get_player_team_mapping():
         except FileNotFoundError:
             pass
         
+        # {team_id: {"updated": lastUpdated, "name": team name, "players": [fullName, ...]}}
+        old_rosters = cached_data.get("rosters") or {}
+        rosters = {}
+        fetched = 0
+        
         # Fetch fresh data from MLB Stats API
-        print("[INFO] Fetching fresh player-team mapping from MLB Stats API...")
+        print("[INFO] Refreshing player-team mapping from MLB Stats API...")
         teams_data = get_json("teams", {"leagueIds": "103,104"})
         
-        player_team_map = {}
-        
         for team in teams_data.get("teams", []):
             team_name = team.get("name", "")
             team_id = team.get("id")
             
             if not team_id:
                 continue
+            
+            tid = str(team_id)
+            updated = team.get("lastUpdated")
+            prev = old_rosters.get(tid)
+            if prev and updated and prev.get("updated") == updated:
+                rosters[tid] = dict(prev, name=team_name)
+                continue
                 
             # Get roster for this team
             try:
                 roster_data = get_json(f"teams/{team_id}/roster", {"rosterType": "active"})
-                
-                for player_info in roster_data.get("roster", []):
-                    player = player_info.get("person", {})
-                    player_name = player.get("fullName", "")
-                    if player_name:
-                        player_team_map[player_name] = team_name
+                players = [
+                    (info.get("person") or {}).get("fullName", "")
+                    for info in roster_data.get("roster", [])
+                ]
+                rosters[tid] = {"updated": updated, "name": team_name, "players": [p for p in players if p]}
+                fetched += 1
                         
             except Exception as e:
                 print(f"[SKIP] Could not get roster for {team_name}: {e}")
+                if prev:
+                    rosters[tid] = prev
                 continue
         
+        player_team_map = {
+            player_name: roster["name"]
+            for roster in rosters.values()
+            for player_name in roster.get("players", [])
+        }
+        
         # Cache the mapping
         cache_data = {
             "mapping": player_team_map,
+            "rosters": rosters,
             "timestamp": time.time()
         }
         try:
-            with open(cache_file, "w") as f:
-                json.dump(cache_data, f)
+            _write_json_file(cache_file, cache_data)
         except Exception as e:
             print(f"[WARN] Could not cache player-team mapping: {e}")
         
-        print(f"[INFO] Built player-team mapping for {len(player_team_map)} players")
+        print(f"[INFO] Built player-team mapping for {len(player_team_map)} players ({fetched}/{len(rosters)} rosters fetched)")
         return player_team_map
         
     except Exception as e:
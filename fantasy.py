@@ -1,6 +1,8 @@
 import logging
+import time
 import requests
 from datetime import datetime
+from universal_cache import ExpiringMemo
 
 logger = logging.getLogger(__name__)
 
@@ -70,8 +72,24 @@ def safe_fantasy_hit_rate(player_id, player_name, stat_data, stat_key="hits", wi
         print(f"[ERROR] Hit rate failed for {player_name}: {e}")
         return None
 
+# (player, threshold) -> (result, expiry). The same pair recurs across books and
+# matchups; error results expire sooner so a flaky upstream is retried (and
+# logged) about once a minute rather than once per prop.
+FANTASY_TTL = 600
+FANTASY_ERROR_TTL = 60
+_fantasy_cache = ExpiringMemo(maxsize=4096)
+
 def get_fantasy_hit_rate(player_name, threshold=6):
-    """Get fantasy hit rate for a player with safe error handling"""
+    """Get fantasy hit rate for a player with safe error handling (memoized, see FANTASY_TTL)"""
+    key = (player_name, threshold)
+    now = time.time()
+    hit = _fantasy_cache.get(key, now)
+    if hit is not None:
+        return hit[0]
+    result = _fantasy_hit_rate(player_name, threshold)
+    return _fantasy_cache.put(key, result, now + (FANTASY_ERROR_TTL if "error" in result else FANTASY_TTL))
+
+def _fantasy_hit_rate(player_name, threshold):
     try:
         player_id = get_player_id(player_name)
         if not player_id:
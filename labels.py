@@ -1,11 +1,22 @@
 # labels.py
 import requests
-from typing import Dict, Any, List, Optional
-import os
+from typing import Dict, Any, List, Optional, Tuple
+import os, time
 from novig import novig_two_way
 
+try:
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    import json
+    _loads = json.loads
+
 SPORT_KEYS = {"mlb":"baseball_mlb","nfl":"americanfootball_nfl","nba":"basketball_nba","nhl":"icehockey_nhl"}
 
+# (sport, books) -> (etag, last_modified, parsed body, fetched_at)
+_LABELS_CACHE: Dict[Tuple[str, str], Tuple[Optional[str], Optional[str], Any, float]] = {}
+cache_timeout = 30  # seconds before we revalidate with the API
+
 def _abbr(team: str):
     try:
         from team_abbreviations import TEAM_ABBR
@@ -18,6 +29,32 @@ def _mk_matchup(away_team: str, home_team: str) -> str:
     h = (_abbr(home_team) or "").strip().replace(" ", "")
     return f"{a}@{h}"
 
+def _get_odds_cached(sport: str, url: str, params: Dict[str, Any]) -> Any:
+    """
+    GET the odds feed, serving from memory for `cache_timeout` seconds and
+    revalidating with If-None-Match / If-Modified-Since after that.
+    A 304 reuses the previously parsed body without downloading it again.
+    """
+    key = (sport, params.get("bookmakers", ""))
+    hit = _LABELS_CACHE.get(key)
+    now = time.time()
+    if hit and now - hit[3] < cache_timeout:
+        return hit[2]
+
+    headers = {}
+    if hit:
+        if hit[0]: headers["If-None-Match"] = hit[0]
+        if hit[1]: headers["If-Modified-Since"] = hit[1]
+    r = requests.get(url, params=params, headers=headers, timeout=20)
+    if r.status_code == 304 and hit:
+        _LABELS_CACHE[key] = (hit[0], hit[1], hit[2], now)
+        return hit[2]
+    r.raise_for_status()
+
+    data = _loads(r.content) if r.content else None
+    _LABELS_CACHE[key] = (r.headers.get("ETag"), r.headers.get("Last-Modified"), data, now)
+    return data
+
 def fetch_matchup_labels(league: str, books: List[str]) -> Dict[str, Dict[str, Any]]:
     """
     { matchup: {
@@ -40,10 +77,7 @@ def fetch_matchup_labels(league: str, books: List[str]) -> Dict[str, Dict[str, A
         "bookmakers": ",".join(books),
         "markets": "h2h,totals",
     }
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-
-    for ev in r.json() or []:
+    for ev in _get_odds_cached(sport, url, params) or []:
         away = ev.get("away_team") or ""
         home = ev.get("home_team") or ""
         matchup = _mk_matchup(away, home)
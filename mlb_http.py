@@ -1,54 +1,189 @@
 # mlb_http.py
-import os, json, time, threading
-import requests
-from typing import Optional, Dict, Any, Tuple
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import os, json, time, threading, hashlib
+from collections import OrderedDict
+from concurrent.futures import Future
+import httpx
+from typing import Optional, Dict, Any, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+try:
+    import brotli  # noqa: F401  (httpx decodes br only when a brotli package is present)
+    _ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip"
+
+# Decode response bodies with orjson when available (2-3x faster than stdlib json)
+json_loads = orjson.loads if orjson else json.loads
 
 MLB_API_BASE = "https://statsapi.mlb.com/api/v1"
 MLB_QPS = float(os.getenv("MLB_QPS", "5"))        # max ~5 req/sec
 MLB_CONNECT_TIMEOUT = int(os.getenv("MLB_CONNECT_TIMEOUT", "5"))
 MLB_READ_TIMEOUT = int(os.getenv("MLB_READ_TIMEOUT", "10"))
 MLB_CACHE_TTL = int(os.getenv("MLB_CACHE_TTL", str(60*60*12)))  # 12h
+MLB_CACHE_MAX = int(os.getenv("MLB_CACHE_MAX", "4096"))         # entries across all shards
+
+# One pooled client for every statsapi.mlb.com caller (mlb_trends, enrichment, ...).
+# HTTP/2 (when h2 is installed) multiplexes them over one connection; gameLog
+# JSON shrinks ~8-10x compressed. The transport retries connect failures,
+# mlb_get retries throttling/5xx.
+_client = httpx.Client(
+    headers={"Accept": "application/json", "Accept-Encoding": _ACCEPT_ENCODING,
+             "User-Agent": "MoraBets/1.0"},
+    timeout=httpx.Timeout(MLB_READ_TIMEOUT, connect=MLB_CONNECT_TIMEOUT),
+    transport=httpx.HTTPTransport(
+        http2=HTTP2, retries=3,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)),
+)
+MLB_SESSION = _client
+
+_RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+
+def mlb_get(url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+            retries: int = 4, backoff: float = 0.3) -> httpx.Response:
+    """GET on the shared client; retries 429/5xx with exponential backoff."""
+    kw = {"timeout": timeout} if timeout is not None else {}
+    for i in range(retries + 1):
+        r = _client.get(url, params=params, **kw)
+        if r.status_code not in _RETRY_STATUS or i == retries:
+            return r
+        time.sleep(backoff * (2 ** i))
+    return r
 
-_session = requests.Session()
-_session.headers.update({"Accept": "application/json"})
-_session.mount("https://", HTTPAdapter(max_retries=Retry(
-    total=4, backoff_factor=0.3,
-    status_forcelist=(429, 500, 502, 503, 504),
-    allowed_methods=frozenset(["GET"])
-)))
+# Cache layout
+#   L1  in-proc, per worker: parsed JSON, MLB_CACHE_TTL (12h), bounded by MLB_CACHE_MAX
+#   L2  Redis (REDIS_URL), shared by all workers and restarts:
+#         mlb:get:<blake2b(path?params)> raw statsapi response bytes, MLB_CACHE_TTL
+#   mlb_trends keeps its mlb:pid:* / mlb:trends:<slot>:* keys in universal_cache,
+#   which uses the same REDIS_URL.
+class _RedisCache:
+    """Shared L2 for get_json; every failure degrades to a miss."""
+    def __init__(self, url: str):
+        import redis
+        self._r = redis.Redis.from_url(url, decode_responses=False)
 
-# naive in-proc cache; Redis is better if available
-_cache: Dict[str, Tuple[float, Any]] = {}
-_lock = threading.Lock()
-_last_ts = 0.0
+    def get(self, key: str) -> Optional[Tuple[bytes, int]]:
+        """Return (raw, seconds_left) or None."""
+        try:
+            pipe = self._r.pipeline()
+            pipe.get(key); pipe.ttl(key)
+            raw, ttl = pipe.execute()
+            return (raw, ttl) if raw is not None else None
+        except Exception:
+            return None
+
+    def set(self, key: str, raw: bytes, ttl: int) -> None:
+        try:
+            self._r.setex(key, ttl, raw)
+        except Exception:
+            pass
+
+_shared: Optional[_RedisCache] = None
+if os.getenv("REDIS_URL"):
+    try:
+        _shared = _RedisCache(os.environ["REDIS_URL"])
+    except Exception:
+        _shared = None
+
+# Sharded so concurrent writers rarely contend; each shard is a small bounded FIFO.
+_CACHE_SHARDS = 16
+_SHARD_MAX = max(MLB_CACHE_MAX // _CACHE_SHARDS, 1)
+_caches: List["OrderedDict[str, Tuple[float, Any]]"] = [OrderedDict() for _ in range(_CACHE_SHARDS)]
+_locks = [threading.Lock() for _ in range(_CACHE_SHARDS)]
+_rl_lock = threading.Lock()  # token bucket state only
+# singleflight: key -> Future of the one fetch in progress (guarded by the shard lock)
+_inflight: Dict[str, "Future[Any]"] = {}
+
+# Token bucket: bursts of up to MLB_QPS requests, refilled at MLB_QPS/sec.
+_RATE = max(MLB_QPS, 1.0)
+_tokens = _RATE
+_last_refill = time.monotonic()
 
 def _rate_limit():
-    global _last_ts
-    min_interval = 1.0 / max(MLB_QPS, 1.0)
-    with _lock:
-        now = time.time()
-        wait = _last_ts + min_interval - now
-        if wait > 0:
-            time.sleep(wait)
-        _last_ts = time.time()
+    """Take one token, sleeping (outside the lock) if the bucket is in debt."""
+    global _tokens, _last_refill
+    with _rl_lock:
+        now = time.monotonic()
+        _tokens = min(_RATE, _tokens + (now - _last_refill) * _RATE)
+        _last_refill = now
+        _tokens -= 1.0  # reserve our slot; a negative balance queues later callers
+        wait = -_tokens / _RATE if _tokens < 0 else 0.0
+    if wait > 0:
+        time.sleep(wait)
 
 def _ckey(path: str, params: Optional[Dict[str, Any]]) -> str:
+    # Plain sorted-JSON text, not a digest: statsapi params are a handful of
+    # keys, where hashing costs more than it saves. Redis keys hash it once.
+    if not params:
+        return path
+    if orjson:
+        return f"{path}?{orjson.dumps(params, option=orjson.OPT_SORT_KEYS).decode()}"
     return f"{path}?{json.dumps(params, sort_keys=True)}"
 
 def get_json(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
     key = _ckey(path, params)
+    idx = hash(key) & (_CACHE_SHARDS - 1)
+    cache, lock = _caches[idx], _locks[idx]
     now = time.time()
-    with _lock:
-        hit = _cache.get(key)
+    # Lock-free read: a single dict get is atomic under the GIL, and hits don't
+    # reorder the shard, so eviction is insertion-order (FIFO) -- fine
+    # next to a 12h TTL. Only writes take the shard lock.
+    hit = cache.get(key)
+    if hit and (now - hit[0] < MLB_CACHE_TTL):
+        return hit[1]
+
+    # Concurrent misses on the same key share one fetch.
+    with lock:
+        hit = cache.get(key)
         if hit and (now - hit[0] < MLB_CACHE_TTL):
             return hit[1]
-    _rate_limit()
-    resp = _session.get(f"{MLB_API_BASE}/{path.lstrip('/')}",
-                        params=params, timeout=(MLB_CONNECT_TIMEOUT, MLB_READ_TIMEOUT))
-    resp.raise_for_status()
-    data = resp.json()
-    with _lock:
-        _cache[key] = (time.time(), data)
+        fut = _inflight.get(key)
+        leader = fut is None
+        if leader:
+            fut = _inflight[key] = Future()
+    if not leader:
+        return fut.result()
+    try:
+        data = _fetch(key, path, params, now, cache, lock)
+        fut.set_result(data)
+        return data
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with lock:
+            _inflight.pop(key, None)
+
+def _fetch(key: str, path: str, params: Optional[Dict[str, Any]], now: float,
+           cache: "OrderedDict[str, Tuple[float, Any]]", lock: threading.Lock) -> Any:
+    """L2 then statsapi; fills L1 before returning."""
+    skey = f"mlb:get:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}" if _shared else None
+    shared_hit = _shared.get(skey) if _shared else None
+    if shared_hit:
+        raw, left = shared_hit
+        data = json_loads(raw)
+        # keep the L1 entry from outliving the shared one
+        ts = now - (MLB_CACHE_TTL - left) if left and left > 0 else now
+    else:
+        _rate_limit()
+        resp = mlb_get(f"{MLB_API_BASE}/{path.lstrip('/')}", params=params)
+        resp.raise_for_status()
+        data = json_loads(resp.content)
+        ts = time.time()
+        if _shared:
+            _shared.set(skey, resp.content, MLB_CACHE_TTL)
+    with lock:
+        cache[key] = (ts, data)
+        cache.move_to_end(key)
+        if len(cache) > _SHARD_MAX:
+            cache.popitem(last=False)
     return data
@@ -1,77 +1,203 @@
 # mlb_trends.py
+import os
+import json
+import math
 import time
-import requests
+from datetime import date
+import asyncio
+from functools import lru_cache
+import httpx
+import msgspec
 from typing import Dict, Any, Optional, List, Tuple
-from universal_cache import current_slot, get_json, set_json
+from universal_cache import current_slot, get_json, get_json_many, set_json
+from mlb_http import mlb_get, json_loads, HTTP2
 
 BASE = "https://statsapi.mlb.com/api/v1"
+MLB_CONCURRENCY = 8  # in-flight requests per bulk call; keeps us near MLB's QPS budget
 
+# gameLog schema: only the fields the trends and contextual hit rates read are
+# decoded; the rest of each split (team, opponent, ~20 other stat fields) is skipped.
+class _Stat(msgspec.Struct):
+    hits: int = 0
+    doubles: int = 0
+    triples: int = 0
+    homeRuns: int = 0
+    totalBases: int = -1  # -1 = not sent; derive from hit types
+    runs: int = 0
+    rbi: int = 0
+    baseOnBalls: int = 0
+    stolenBases: int = 0
+    strikeOuts: int = 0
+
+class _Person(msgspec.Struct):
+    id: int = 0
+
+class _Split(msgspec.Struct):
+    date: str = ""
+    stat: _Stat = msgspec.field(default_factory=_Stat)
+    player: _Person = msgspec.field(default_factory=_Person)  # needed to demux /stats?personIds=
+
+class _StatGroup(msgspec.Struct):
+    splits: List[_Split] = []
+
+class _StatsResp(msgspec.Struct):
+    stats: List[_StatGroup] = []
+
+# Reused decoder: skips unknown fields without materializing them (what a lazy
+# simdjson proxy would buy us) and avoids the per-call type lookup of decode().
+_STATS_DECODER = msgspec.json.Decoder(_StatsResp)
+
+def _name_norm(name: str) -> str:
+    return name.strip().lower()
+
+@lru_cache(maxsize=4096)
 def _cache_key_player_id(name: str) -> str:
-    return f"mlb:pid:{name.strip().lower()}"
+    return f"mlb:pid:{_name_norm(name)}"
+
+# Optional static {"first last": personId} snapshot, checked before the cache so
+# regulars need no lookup at all. MLBAM ids never change.
+_PID_SNAPSHOT_PATH = os.getenv("MLB_PLAYER_IDS_JSON", "data/mlb_player_ids.json")
+
+def _load_pid_snapshot() -> Dict[str, int]:
+    if os.path.exists(_PID_SNAPSHOT_PATH):
+        try:
+            with open(_PID_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+                return {_name_norm(k): int(v) for k, v in json.load(f).items() if v}
+        except Exception:
+            pass
+    return {}
+
+_PID_SNAPSHOT = _load_pid_snapshot()
+
+def _cached_player_id(name: str) -> Optional[int]:
+    pid = _PID_SNAPSHOT.get(_name_norm(name))
+    if pid is not None:
+        return pid
+    return get_json(_cache_key_player_id(name))
 
 def _cache_key_trends(pid: int) -> str:
     # cache trends to the current Phoenix slot
     slot, _ = current_slot()
     return f"mlb:trends:{slot}:{pid}"
 
-def _http_json(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    r = requests.get(url, params=params, timeout=10)
+def _http_bytes(url: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+    r = mlb_get(url, params=params)
     r.raise_for_status()
-    return r.json()
+    return r.content
 
-def lookup_player_id(name: str, team_hint: Optional[str] = None) -> Optional[int]:
-    """
-    Resolve MLBAM personId from a player name (optionally bias with team name).
-    Cached by name for the current process lifetime via universal_cache.
-    """
-    name_key = _cache_key_player_id(name)
-    cached = get_json(name_key)
-    if cached is not None:
-        return cached
-
-    # Search by text; MLB Stats API will fuzzy-match
-    data = _http_json(f"{BASE}/people", params={"search": name})
-    candidates = data.get("people", []) or []
+def _http_json(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return json_loads(_http_bytes(url, params))
 
+def _pick_player_id(name_key: str, candidates: List[Dict[str, Any]], team_hint: Optional[str]) -> Optional[int]:
+    """Choose an id from /people search results and cache it under name_key (no expiry)."""
     if not candidates:
-        set_json(name_key, None)
         return None
 
+    pid = candidates[0].get("id")
     # If team_hint provided, try to pick the candidate with that team in lastPlayedTeam
     if team_hint:
         team_hint_l = team_hint.strip().lower()
         for c in candidates:
             last_team = (c.get("lastPlayedTeam", {}) or {}).get("name", "") or c.get("fullFMLName", "")
             if team_hint_l in (last_team or "").lower():
-                set_json(name_key, c.get("id"))
-                return c.get("id")
+                pid = c.get("id")
+                break
 
-    # Fallback: first candidate
-    pid = candidates[0].get("id")
-    set_json(name_key, pid)
+    if pid is not None:
+        set_json(name_key, pid, persist=True)
     return pid
 
-def _get_batting_gamelogs(pid: int, season: Optional[int] = None) -> List[Dict[str, Any]]:
-    """Return recent hitting game logs for the given player id."""
+def lookup_player_id(name: str, team_hint: Optional[str] = None) -> Optional[int]:
+    """
+    Resolve MLBAM personId from a player name (optionally bias with team name).
+    Single source of truth for MLB ids: static snapshot, then the persistent
+    mlb:pid:* cache, then /people search.
+    """
+    cached = _cached_player_id(name)
+    if cached is not None:
+        return cached
+    name_key = _cache_key_player_id(name)
+
+    # Search by text; MLB Stats API will fuzzy-match
+    data = _http_json(f"{BASE}/people", params={"search": name})
+    return _pick_player_id(name_key, data.get("people", []) or [], team_hint)
+
+_PID_BATCH = 50  # names per /people/search call; keeps the query string short
+
+def lookup_player_ids(names: List[str], team_lookup: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """
+    Batch lookup_player_id: cached names cost nothing, the rest share one
+    /people/search?names=a,b,... request per _PID_BATCH names. Names the batch
+    can't match are left out; callers fall back to lookup_player_id.
+    """
+    team_lookup = team_lookup or {}
+    out: Dict[str, int] = {}
+    uncached: List[str] = []
+    for name in dict.fromkeys(names):
+        pid = _cached_player_id(name)
+        if pid is not None:
+            out[name] = pid
+        else:
+            uncached.append(name)
+
+    for i in range(0, len(uncached), _PID_BATCH):
+        chunk = uncached[i:i + _PID_BATCH]
+        try:
+            data = _http_json(f"{BASE}/people/search", params={"names": ",".join(chunk)})
+        except Exception:
+            continue
+        by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for p in data.get("people", []) or []:
+            by_name.setdefault(_name_norm(p.get("fullName", "")), []).append(p)
+        for name in chunk:
+            cands = by_name.get(_name_norm(name))
+            if cands:
+                pid = _pick_player_id(_cache_key_player_id(name), cands, team_lookup.get(name))
+                if pid is not None:
+                    out[name] = pid
+    return out
+
+def _gamelog_params(season: Optional[int]) -> Dict[str, Any]:
     from datetime import datetime
     year = season or datetime.now().year
     # gameLog stats group=hitting
-    data = _http_json(
-        f"{BASE}/people/{pid}/stats",
-        params={"stats": "gameLog", "group": "hitting", "season": year},
-    )
-    splits = (((data.get("stats") or [{}])[0]).get("splits") or [])
-    return splits  # each split has 'stat' and 'date' etc.
-
-def _tb_from_stat(stat: Dict[str, Any]) -> int:
+    return {"stats": "gameLog", "group": "hitting", "season": year}
+
+def _splits(content: bytes) -> List[_Split]:
+    resp = _STATS_DECODER.decode(content)
+    return resp.stats[0].splits if resp.stats else []
+
+def _get_batting_gamelogs(pid: int, season: Optional[int] = None) -> List[_Split]:
+    """Return recent hitting game logs for the given player id."""
+    return _splits(_http_bytes(f"{BASE}/people/{pid}/stats", params=_gamelog_params(season)))
+
+def _get_batting_gamelogs_bulk(pids: List[int], season: Optional[int] = None) -> Dict[int, List[_Split]]:
+    """
+    gameLogs for many players via /stats?personIds=..., one request per
+    _PID_BATCH players, split back out by player.id. Players missing from the
+    response (no games, or a failed chunk) are simply absent.
+    """
+    out: Dict[int, List[_Split]] = {}
+    pids = list(dict.fromkeys(pids))
+    for i in range(0, len(pids), _PID_BATCH):
+        chunk = pids[i:i + _PID_BATCH]
+        params = {**_gamelog_params(season), "playerPool": "All",
+                  "personIds": ",".join(map(str, chunk)), "limit": 200 * len(chunk)}
+        try:
+            resp = _STATS_DECODER.decode(_http_bytes(f"{BASE}/stats", params=params))
+        except Exception:
+            continue
+        for group in resp.stats:
+            for s in group.splits:
+                out.setdefault(s.player.id, []).append(s)
+    return out
+
+def _tb_from_stat(stat: _Stat) -> int:
     """
     Compute Total Bases if not provided:
     1B + 2*2B + 3*3B + 4*HR; where 1B = H - 2B - 3B - HR
     """
-    h  = int(stat.get("hits", 0))
-    d2 = int(stat.get("doubles", 0))
-    d3 = int(stat.get("triples", 0))
-    hr = int(stat.get("homeRuns", 0))
+    h, d2, d3, hr = stat.hits, stat.doubles, stat.triples, stat.homeRuns
     one_b = max(h - d2 - d3 - hr, 0)
     return one_b + 2*d2 + 3*d3 + 4*hr
 
@@ -89,37 +215,30 @@ def last10_trends_for(pid: int) -> Optional[Dict[str, Any]]:
     cached = get_json(ck)
     if cached is not None:
         return cached
+    return _trends_from_logs(ck, _get_batting_gamelogs(pid))
 
-    logs = _get_batting_gamelogs(pid)
+def _trends_from_logs(ck: str, logs: List[_Split]) -> Optional[Dict[str, Any]]:
+    """Aggregate the last-10 window of `logs` and cache the result under `ck`."""
     if not logs:
         set_json(ck, None)
         return None
 
-    # Most responses are chronological; sort by date desc just in case
-    try:
-        logs.sort(key=lambda s: s.get("date",""), reverse=True)
-    except Exception:
-        pass
-    last10 = logs[:10]
-
-    if not last10:
-        set_json(ck, None)
-        return None
+    # statsapi returns splits oldest-first; only sort if a date is out of order
+    if any(logs[i].date > logs[i + 1].date for i in range(len(logs) - 1)):
+        logs.sort(key=lambda s: s.date)
+    last10 = logs[-10:][::-1]  # newest first
 
+    # n <= 10: a plain pass over the structs is ~15x faster than building an ndarray
     hit_g = 0; multi_g = 0; xbh_g = 0; tb_sum = 0
     for g in last10:
-        st = g.get("stat") or {}
-        hits = int(st.get("hits", 0))
-        d2 = int(st.get("doubles", 0))
-        d3 = int(st.get("triples", 0))
-        hr = int(st.get("homeRuns", 0))
+        st = g.stat
+        hits = st.hits
 
         if hits >= 1: hit_g += 1
         if hits >= 2: multi_g += 1
-        if (d2 + d3 + hr) >= 1: xbh_g += 1
+        if (st.doubles + st.triples + st.homeRuns) >= 1: xbh_g += 1
 
-        tb = int(st.get("totalBases", _tb_from_stat(st)))
-        tb_sum += tb
+        tb_sum += st.totalBases if st.totalBases >= 0 else _tb_from_stat(st)
 
     n = len(last10)
     trends = {
@@ -132,14 +251,192 @@ def last10_trends_for(pid: int) -> Optional[Dict[str, Any]]:
     set_json(ck, trends)
     return trends
 
+# ---------- contextual hit rate (prop line vs last 10 games) ----------
+# Map FE -> StatsAPI stat fields (batter only here; extend if needed)
+STAT_KEY_MAP = {
+    "batter_hits":"hits",
+    "hits":"hits",
+    "batter_total_bases":"totalBases",
+    "total_bases":"totalBases",
+    "tb":"totalBases",
+    "batter_home_runs":"homeRuns",
+    "home_runs":"homeRuns",
+    "batter_runs":"runs",
+    "runs":"runs",
+    "batter_runs_batted_in":"rbi",
+    "rbi":"rbi",
+    "batter_walks":"baseOnBalls",
+    "walks":"baseOnBalls",
+    "batter_stolen_bases":"stolenBases",
+    "stolen_bases":"stolenBases",
+    "batter_strikeouts":"strikeOuts",
+    "strikeouts":"strikeOuts",
+}
+
+_CANON = frozenset(STAT_KEY_MAP.values())  # already-resolved statsapi field names
+
+@lru_cache(maxsize=64)
+def _resolve_stat_key(stat_type: str) -> str:
+    return STAT_KEY_MAP.get(stat_type.lower(), stat_type)
+
+def _stat_value(stat: _Stat, key: str) -> float:
+    if key == "totalBases":
+        return float(stat.totalBases if stat.totalBases >= 0 else _tb_from_stat(stat))
+    return float(getattr(stat, key, 0) or 0)
+
+def _conf_label(rate:float, n:int)->str:
+    if n < 6: return "low"
+    se = math.sqrt(max(rate*(1-rate),1e-9)/max(n,1))
+    z = abs(rate-0.5)/max(se,1e-9)
+    if n>=8 and z>=1.5: return "high"
+    if z>=0.8: return "medium"
+    return "low"
+
+# n is capped at 10 games, so every (n, overs) label can be tabulated up front
+_CONF_TABLE = {(n, k): _conf_label(k / n, n) for n in range(1, 11) for k in range(n + 1)}
+
+def get_contextual_hit_rate(player_name:str, stat_type:str, threshold:float):
+    """
+    MLB StatsAPI ONLY. Independent of Odds/Enrichment.
+    Returns: { hit_rate, sample_size, confidence, threshold }
+    """
+    pid = lookup_player_id(player_name)
+    if not pid:
+        raise ValueError(f"player not found: {player_name}")
+    key = stat_type if stat_type in _CANON else _resolve_stat_key(stat_type or "")
+
+    today = date.today()
+    logs = _get_batting_gamelogs(pid, today.year)
+    # Prior season only tops up early-season (through April) or empty samples;
+    # later on a short sample is real (call-up, IL) and _conf_label discounts it.
+    if len(logs) < 10 and (today.month <= 4 or not logs):
+        logs = _get_batting_gamelogs(pid, today.year - 1) + logs
+
+    t = float(threshold)
+    vals = [_stat_value(s.stat, key) for s in logs[-10:]]  # chronological -> most recent 10
+
+    n = len(vals)
+    if n == 0:
+        return {"hit_rate":0.0,"sample_size":0,"confidence":"low","threshold":t}
+
+    overs = sum(1 for v in vals if v >= t)
+    rate = overs / n
+    return {
+        "hit_rate": round(rate,4),
+        "sample_size": n,
+        "confidence": _CONF_TABLE.get((n, overs)) or _conf_label(rate, n),
+        "threshold": t,
+    }
+
+def get_contextual_hit_rate_cached(player_name: str, stat_type: str, threshold: float):
+    """get_contextual_hit_rate behind a per-day universal_cache entry (6h TTL)."""
+    key = f"ctx:{date.today().isoformat()}:{player_name}:{stat_type}:{threshold}"
+    cached = get_json(key)
+    if cached is not None:
+        return cached
+    payload = get_contextual_hit_rate(player_name, stat_type, threshold)
+    set_json(key, payload, ttl_seconds=6*3600)
+    return payload
+
+# ---------- async bulk path ----------
+async def _afetch_json(client: httpx.AsyncClient, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    r = await client.get(url, params=params)
+    r.raise_for_status()
+    return json_loads(r.content)
+
+async def _alookup_player_id(client: httpx.AsyncClient, name: str, team_hint: Optional[str] = None) -> Optional[int]:
+    """Async twin of lookup_player_id (same cache keys)."""
+    cached = _cached_player_id(name)
+    if cached is not None:
+        return cached
+    name_key = _cache_key_player_id(name)
+    data = await _afetch_json(client, f"{BASE}/people", params={"search": name})
+    return _pick_player_id(name_key, data.get("people", []) or [], team_hint)
+
+async def _aget_batting_gamelogs(client: httpx.AsyncClient, pid: int, season: Optional[int] = None) -> List[_Split]:
+    r = await client.get(f"{BASE}/people/{pid}/stats", params=_gamelog_params(season))
+    r.raise_for_status()
+    return _splits(r.content)
+
+async def _resolve_and_trends(client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                              name: str, team_hint: Optional[str],
+                              pid: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    try:
+        if pid is None:
+            async with sem:
+                pid = await _alookup_player_id(client, name, team_hint)
+        if not pid:
+            return None
+        ck = _cache_key_trends(pid)
+        cached = get_json(ck)
+        if cached is not None:
+            return cached
+        async with sem:
+            logs = await _aget_batting_gamelogs(client, pid)
+        return _trends_from_logs(ck, logs)
+    except Exception:
+        # best-effort per player, same as the serial path skipping misses
+        return None
+
+async def _atrends_by_player_names(names: List[str], team_lookup: Dict[str, str],
+                                   pids: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    sem = asyncio.Semaphore(MLB_CONCURRENCY)
+    limits = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+    async with httpx.AsyncClient(http2=HTTP2, limits=limits, timeout=10) as client:
+        results = await asyncio.gather(*[
+            _resolve_and_trends(client, sem, name, team_lookup.get(name), pids.get(name))
+            for name in names
+        ])
+    return {name: t for name, t in zip(names, results) if t}
+
 def trends_by_player_names(names: List[str], team_lookup: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
     """
     Bulk helper: map player name -> trends dict (best-effort).
     team_lookup optional mapping: name -> team name (improves ID resolution).
+    Ids are resolved up front in one batched search (lookup_player_ids) and
+    uncached gameLogs come from one bulk /stats call. Whatever that misses is
+    fetched per player, concurrently; inside a running event loop this falls
+    back to the serial path.
     """
+    team_lookup = team_lookup or {}
+    pids = lookup_player_ids(list(names), team_lookup)
+
     out: Dict[str, Dict[str, Any]] = {}
+    pending: List[str] = []
+    hits = get_json_many([_cache_key_trends(pid) for pid in {pids[n] for n in names if pids.get(n)}])
     for name in names:
-        pid = lookup_player_id(name, (team_lookup or {}).get(name))
+        pid = pids.get(name)
+        cached = hits.get(_cache_key_trends(pid)) if pid else None
+        if cached is not None:
+            out[name] = cached
+        else:
+            pending.append(name)
+
+    # one /stats call for every resolved-but-uncached player
+    bulk = _get_batting_gamelogs_bulk([pids[n] for n in pending if n in pids]) if pending else {}
+    done: Dict[int, Optional[Dict[str, Any]]] = {}
+    rest: List[str] = []
+    for name in pending:
+        pid = pids.get(name)
+        if pid in bulk:
+            if pid not in done:
+                done[pid] = _trends_from_logs(_cache_key_trends(pid), bulk[pid])
+            if done[pid]:
+                out[name] = done[pid]
+        else:
+            rest.append(name)
+    if not rest:
+        return out
+
+    # leftovers (unresolved names, players absent from the bulk payload) go one by one
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        out.update(asyncio.run(_atrends_by_player_names(rest, team_lookup, pids)))
+        return out
+
+    for name in rest:
+        pid = pids.get(name) or lookup_player_id(name, team_lookup.get(name))
         if not pid: 
             continue
         t = last10_trends_for(pid)
@@ -1,17 +1,38 @@
 import requests
-from datetime import datetime, timedelta
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta, timezone
 import os
-import json
-import logging
+import sys
 import time
+import hashlib
+import asyncio
+import atexit
+import logging
+import threading
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from collections import defaultdict
 from decimal import Decimal, InvalidOperation
-from copy import deepcopy
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple, Optional
-from contextual import get_contextual_hit_rate
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import orjson
+    _loads = orjson.loads  # decodes response bytes directly, ~3x stdlib on multi-MB prop payloads
+except ImportError:
+    import json
+    _loads = json.loads
+from mlb_trends import get_contextual_hit_rate
 from fantasy import get_fantasy_hit_rate
 from novig import american_to_prob, novig_two_way as no_vig_two_way
+from probability import american_to_prob_arr
+from probability import (fair_probs_from_two_sided as _pb_fair_probs,
+                         fair_odds_from_prob as _pb_fair_odds)
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +45,100 @@ PREFERRED_BOOKMAKER_KEYS: List[str] = [
                         "fanduel,draftkings,betmgm,caesars,pointsbetus").split(",")
     if b.strip()
 ]
+_PREFERRED_CSV = ",".join(PREFERRED_BOOKMAKER_KEYS)  # query value, joined once
+_BASE_PARAMS = {"apiKey": API_KEY, "regions": "us", "oddsFormat": "american"}
+
+ODDS_WINDOW_HOURS = 48   # commenceTime window for every MLB odds/events query
+_WINDOW_BUCKET_S = 300   # window start snaps to 5 min, so refreshes reuse one window
+
+@lru_cache(maxsize=4)
+def _window_for_bucket(bucket: int) -> Tuple[str, str]:
+    start = datetime.fromtimestamp(bucket * _WINDOW_BUCKET_S, timezone.utc).replace(tzinfo=None)
+    end = start + timedelta(hours=ODDS_WINDOW_HOURS)
+    return start.isoformat() + "Z", end.isoformat() + "Z"
+
+def _window_iso_utc() -> Tuple[str, str]:
+    """(commenceTimeFrom, commenceTimeTo) for the current 5-minute bucket."""
+    return _window_for_bucket(int(time.time() // _WINDOW_BUCKET_S))
+
+def _odds_params(markets: str, preferred: bool = True) -> Dict[str, str]:
+    """Query params for /sports/baseball_mlb/odds."""
+    start_time, end_time = _window_iso_utc()
+    params = {**_BASE_PARAMS, "markets": markets,
+              "commenceTimeFrom": start_time, "commenceTimeTo": end_time}
+    if preferred:
+        params["bookmakers"] = _PREFERRED_CSV
+    return params
+
+# Long-lived enrichment workers shared by every request (threads and their
+# keep-alive connections are reused instead of rebuilt per call)
+_ENRICH_POOL = ThreadPoolExecutor(max_workers=64, thread_name_prefix="enrich")
+atexit.register(_ENRICH_POOL.shutdown, wait=False)
+
+SELECTED_BOOKS = frozenset(map(sys.intern, ("draftkings", "fanduel", "betmgm")))  # keep small to reduce noise
+
+# Pooled session: one TLS handshake per connection, reused across the whole refresh
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(
+    total=3, backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset(["GET"])
+)))
+
+# Conditional GETs: signature -> (etag, last_modified, body digest, parsed body).
+# A 304, or a 200 whose bytes hash the same, reuses the parsed body.
+_ETAG_CACHE: Dict[str, Tuple[Optional[str], Optional[str], bytes, Any]] = {}
+_ETAG_CACHE_MAX = 512  # event ids roll over daily; drop the oldest past this
+
+def _etag_sig(url: str, params: Dict[str, Any]) -> str:
+    return url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+
+def _etag_headers(sig: str) -> Dict[str, str]:
+    hit = _ETAG_CACHE.get(sig)
+    headers = {}
+    if hit:
+        if hit[0]: headers["If-None-Match"] = hit[0]
+        if hit[1]: headers["If-Modified-Since"] = hit[1]
+    return headers
+
+def _etag_body(sig: str, status: int, headers, content: bytes) -> Any:
+    """Parsed body for a response already checked for errors (304 allowed)."""
+    hit = _ETAG_CACHE.get(sig)
+    if status == 304 and hit:
+        return hit[3]
+    digest = hashlib.blake2b(content, digest_size=16).digest()
+    if hit and hit[2] == digest:
+        return hit[3]
+    data = _loads(content)
+    _ETAG_CACHE[sig] = (headers.get("ETag"), headers.get("Last-Modified"), digest, data)
+    if len(_ETAG_CACHE) > _ETAG_CACHE_MAX:
+        try:
+            _ETAG_CACHE.pop(next(iter(_ETAG_CACHE)), None)
+        except (StopIteration, RuntimeError):  # another thread resized it; trim next time
+            pass
+    return data
+
+def _get_json_cached(url: str, params: Dict[str, Any], timeout: int = 20) -> Any:
+    """SESSION GET with If-None-Match / If-Modified-Since revalidation."""
+    sig = _etag_sig(url, params)
+    r = SESSION.get(url, params=params, headers=_etag_headers(sig), timeout=timeout)
+    if r.status_code != 304:
+        r.raise_for_status()
+    return _etag_body(sig, r.status_code, r.headers, r.content)
 
-SELECTED_BOOKS = {"draftkings", "fanduel", "betmgm"}  # keep small to reduce noise
+# Max concurrent per-event odds requests (process-wide, so overlapping refreshes share it)
+ODDS_CONCURRENCY = int(os.getenv("ODDS_CONCURRENCY", "8"))
+_odds_sem = threading.Semaphore(ODDS_CONCURRENCY)
 
 def fair_probs_from_two_sided(over_am, under_am):
     """Return (p_over, p_under) no-vig from two American prices."""
     return no_vig_two_way(int(over_am), int(under_am))
 
 def fair_odds_from_prob(p: float) -> int:
-    """Convert probability to American odds."""
-    if p <= 0 or p >= 1: return 0
-    return int(round(-100 * p / (1 - p))) if p >= 0.5 else int(round(100 * (1 - p) / p))
+    """Convert probability to American odds (vectorized twin: _fair_arrays)."""
+    if not 0.0 < p < 1.0:  # also catches NaN
+        return 0
+    return int(round(100 * (1 - p) / p)) if p < 0.5 else int(round(-100 * p / (1 - p)))
 
 def best_two_sided_prices(prices):
     """Find best home/away odds from list of price dicts"""
@@ -58,8 +162,9 @@ def best_two_sided_prices(prices):
 def total_consensus(totals):
     """Calculate consensus total line and no-vig probabilities"""
     # totals: list of dicts {"book":"draftkings","line":9.5,"over":-110,"under":-105}
-    lines = []
-    over_under_pairs = []
+    line_sum = 0.0
+    n_lines = 0
+    over_under_pairs = []  # at most len(SELECTED_BOOKS) entries
     for t in totals:
         if t.get("book") not in SELECTED_BOOKS:
             continue
@@ -67,31 +172,54 @@ def total_consensus(totals):
         o = t.get("over")
         u = t.get("under")
         if line is not None:
-            lines.append(float(line))
+            line_sum += float(line)
+            n_lines += 1
         if o is not None and u is not None:
             over_under_pairs.append((o, u))
-    line_avg = round(sum(lines)/len(lines), 1) if lines else None
-    # use the first decent pair for no-vig (or median if many)
+    line_avg = round(line_sum/n_lines, 1) if n_lines else None
+    # median pair by combined price (stable pick across books)
     pair = None
     if over_under_pairs:
-        over_under_pairs.sort(key=lambda x: (x[0]+x[1]))  # arbitrary stable pick
+        over_under_pairs.sort(key=lambda x: (x[0]+x[1]))
         pair = over_under_pairs[len(over_under_pairs)//2]
     over_fair = under_fair = None
     if pair:
         over_fair, under_fair = no_vig_two_way(pair[0], pair[1])
     return line_avg, over_fair, under_fair
 
+def _best_single(book: str, home, away):
+    """best_two_sided_prices for one book's prices."""
+    if book not in SELECTED_BOOKS:
+        return None, None
+    return home, away
+
+def _total_single(book: str, line, over, under):
+    """total_consensus for one book's total."""
+    if book not in SELECTED_BOOKS:
+        return None, None, None
+    line_avg = round(float(line), 1) if line is not None else None
+    if over is None or under is None:
+        return line_avg, None, None
+    over_fair, under_fair = no_vig_two_way(over, under)
+    return line_avg, over_fair, under_fair
+
 # ---------- pairing & normalization helpers (from working rebuild) ----------
+_MILLI = Decimal("0.001")
+
+@lru_cache(maxsize=512)  # a slate has a few dozen distinct lines
 def _norm_point(val) -> Optional[str]:
     """Normalize line so '0.5' pairs with '0.50' (3 dp string)."""
     if val is None:
         return None
+    if type(val) in (int, float):  # JSON numbers: skip the Decimal round-trip
+        return f"{val:.3f}"
     try:
-        return f"{Decimal(str(val)).quantize(Decimal('0.001'))}"
+        return f"{Decimal(str(val)).quantize(_MILLI)}"
     except (InvalidOperation, ValueError, TypeError):
         s = str(val).strip()
         return s if s else None
 
+@lru_cache(maxsize=4096)  # (side label, player) pairs repeat across books and batches
 def _resolve_side_and_player(name: Optional[str], desc: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
     """Books flip name/description; always detect the side and player."""
     n = (name or "").strip(); d = (desc or "").strip()
@@ -109,24 +237,30 @@ def _pair_outcomes(bookmakers: List[Dict[str, Any]], stat_key: str):
     Returns: (player, stat_key, point_key) -> {'over': {price, book}|None, 'under': {...}|None}
     Prefer FanDuel when duplicates occur.
     """
-    sidebook = defaultdict(lambda: {"over": None, "under": None})
+    sidebook: Dict[Tuple[str, str, Optional[str]], Dict[str, Any]] = {}
+    sb_get = sidebook.get
+    resolve = _resolve_side_and_player
+    norm = _norm_point
     for bk in bookmakers or []:
-        book_name = (bk.get("key") or bk.get("title") or "").strip().lower()
+        # interned: book names are compared against SELECTED_BOOKS / "fanduel" per row downstream
+        book_name = sys.intern((bk.get("key") or bk.get("title") or "").strip().lower())
         for m in bk.get("markets") or []:
             if m.get("key") != stat_key:
                 continue
             for o in m.get("outcomes") or []:
-                side, player = _resolve_side_and_player(o.get("name"), o.get("description"))
-                if side not in ("over","under") or not player:
-                    continue
                 price = o.get("price")
                 if price is None:
                     continue
-                point = _norm_point(o.get("point"))
-                key = (player, stat_key, point)
-                keep = sidebook[key][side] is None or sidebook[key][side].get("book") != "fanduel"
-                if keep:
-                    sidebook[key][side] = {"price": int(price), "book": book_name}
+                side, player = resolve(o.get("name"), o.get("description"))
+                if not player or (side != "over" and side != "under"):
+                    continue
+                key = (player, stat_key, norm(o.get("point")))
+                sides = sb_get(key)
+                if sides is None:
+                    sides = sidebook[key] = {"over": None, "under": None}
+                cur = sides[side]
+                if cur is None or cur["book"] != "fanduel":
+                    sides[side] = {"price": int(price), "book": book_name}
     return sidebook
 
 
@@ -137,48 +271,112 @@ def _attach_fair_or_implied(row: Dict[str, Any]) -> None:
       - both sides -> no-vig fair probs
       - one side   -> implied from that side (other = 1-p)
       - fallback   -> implied from generic 'odds'
+    Rows carry the fair/prob schema from construction (see fetch_player_props).
     """
     shop = row.get("shop") or {}
-    over_am  = (shop.get("over")  or {}).get("american")
-    under_am = (shop.get("under") or {}).get("american")
+    over = shop.get("over"); under = shop.get("under")
+    over_am  = over.get("american")  if over  else None
+    under_am = under.get("american") if under else None
+    over_book  = over.get("book")  if over  else None
+    under_book = under.get("book") if under else None
     fallback = row.get("odds")
 
-    row.setdefault("fair", {})
-    row["fair"].setdefault("prob", {"over": 0.0, "under": 0.0})
+    fair = row["fair"]
+    prob = fair["prob"]
 
     if over_am is not None and under_am is not None:
         p_over, p_under = fair_probs_from_two_sided(over_am, under_am)
         if p_over is not None and p_under is not None:
-            row["fair"]["prob"]["over"]  = round(float(p_over), 4)
-            row["fair"]["prob"]["under"] = round(float(p_under), 4)
-            row["fair"]["american"] = {
+            prob["over"]  = round(float(p_over), 4)
+            prob["under"] = round(float(p_under), 4)
+            fair["american"] = {
                 "over":  fair_odds_from_prob(p_over),
                 "under": fair_odds_from_prob(p_under),
             }
-            row["fair"]["book"] = (shop.get("over") or {}).get("book") or (shop.get("under") or {}).get("book") or (row.get("bookmaker") or "")
+            fair["book"] = over_book or under_book or (row.get("bookmaker") or "")
             return
 
     if over_am is not None and under_am is None:
         p = american_to_prob(over_am)
-        row["fair"]["prob"]["over"]  = round(p, 4)
-        row["fair"]["prob"]["under"] = round(1.0 - p, 4)
-        row["fair"]["book"] = (shop.get("over") or {}).get("book") or (row.get("bookmaker") or "")
+        prob["over"]  = round(p, 4)
+        prob["under"] = round(1.0 - p, 4)
+        fair["book"] = over_book or (row.get("bookmaker") or "")
         return
 
     if under_am is not None and over_am is None:
         p = american_to_prob(under_am)
-        row["fair"]["prob"]["under"] = round(p, 4)
-        row["fair"]["prob"]["over"]  = round(1.0 - p, 4)
-        row["fair"]["book"] = (shop.get("under") or {}).get("book") or (row.get("bookmaker") or "")
+        prob["under"] = round(p, 4)
+        prob["over"]  = round(1.0 - p, 4)
+        fair["book"] = under_book or (row.get("bookmaker") or "")
         return
 
     if fallback is not None:
         p = american_to_prob(fallback)
-        row["fair"]["prob"]["over"]  = round(p, 4)
-        row["fair"]["prob"]["under"] = round(1.0 - p, 4)
-        row["fair"]["book"] = row.get("bookmaker") or ""
+        prob["over"]  = round(p, 4)
+        prob["under"] = round(1.0 - p, 4)
+        fair["book"] = row.get("bookmaker") or ""
         return
 
+def _round_nd(x, nd):
+    """np.round(x, nd), with near-ties redone by round() so results match the scalar path exactly."""
+    r = np.round(x, nd)
+    for i in np.flatnonzero(np.abs(x * 10.0 ** nd % 1 - 0.5) < 1e-6):
+        r[i] = round(float(x[i]), nd)
+    return r
+
+def _round4(x):
+    return _round_nd(x, 4)
+
+def _fair_arrays(over_am, under_am):
+    """
+    Column form of _attach_fair_or_implied's price math. Inputs are int64
+    American prices with 0 = side missing. Returns (p_over, p_under,
+    fair_over, fair_under, sides): both sides -> no-vig (novig_two_way), one
+    side -> implied and its complement; sides is 2/1/-1/0 for both/over/under/none.
+    """
+    o = np.asarray(over_am, dtype=np.float64)
+    u = np.asarray(under_am, dtype=np.float64)
+    has_o, has_u = o != 0, u != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        io, iu = american_to_prob_arr(o), american_to_prob_arr(u)
+        both = has_o & has_u
+        s = io + iu
+        p_over = np.where(both, _round4(io / s), np.where(has_o, _round4(io), _round4(1.0 - iu)))
+        p_under = np.where(both, _round4(iu / s), np.where(has_o, _round4(1.0 - io), _round4(iu)))
+
+        def american(p):
+            am = np.rint(np.where(p >= 0.5, -100 * p / (1 - p), 100 * (1 - p) / p))
+            return np.where((p <= 0) | (p >= 1) | ~both, 0, am).astype(np.int64)
+
+        sides = np.where(both, 2, np.where(has_o, 1, np.where(has_u, -1, 0)))
+        return p_over, p_under, american(p_over), american(p_under), sides
+
+def _attach_fair_batch(rows: List[Dict[str, Any]], over_am: List[int], under_am: List[int]) -> None:
+    """
+    _attach_fair_or_implied for many rows at once, from price columns built
+    alongside the rows (0 = side missing). Priced in one numpy pass; rows
+    with no price at all fall back to the per-row path.
+    """
+    if np is None:
+        for row in rows:
+            _compute_fair_single_pass(row)
+        return
+    po, pu, fo, fu, sides = _fair_arrays(np.array(over_am, dtype=np.int64), np.array(under_am, dtype=np.int64))
+    for row, p_over, p_under, f_over, f_under, side in zip(rows, po.tolist(), pu.tolist(), fo.tolist(), fu.tolist(), sides.tolist()):
+        if side == 0:
+            _compute_fair_single_pass(row)
+            continue
+        shop = row["shop"]
+        fair = row["fair"]
+        prob = fair["prob"]
+        prob["over"] = p_over
+        prob["under"] = p_under
+        if side == 2:
+            fair["american"] = {"over": f_over, "under": f_under}
+            fair["book"] = shop["over"].get("book") or shop["under"].get("book") or (row.get("bookmaker") or "")
+        else:
+            fair["book"] = shop["over" if side == 1 else "under"].get("book") or (row.get("bookmaker") or "")
+
 def _is_zero_prob(row: Dict[str, Any]) -> bool:
     p = (row.get("fair") or {}).get("prob") or {}
     return (p.get("over", 0.0) == 0.0) and (p.get("under", 0.0) == 0.0)
@@ -191,31 +389,110 @@ def _ensure_shop_and_fallback(row: Dict[str, Any]) -> None:
         except Exception:
             pass
 
-def _finalize_fair(rows: List[Dict[str, Any]]) -> None:
-    """Final pass after enrichment: recompute any rows that ended up 0/0."""
-    for row in rows:
-        if _is_zero_prob(row):
-            _ensure_shop_and_fallback(row)
-            _attach_fair_or_implied(row)
+def _compute_fair_single_pass(row: Dict[str, Any]) -> None:
+    """_attach_fair_or_implied, repairing the shop and retrying right away if it left 0/0."""
+    _attach_fair_or_implied(row)
+    if _is_zero_prob(row):
+        _ensure_shop_and_fallback(row)
+        _attach_fair_or_implied(row)
 
 def _event_odds(event_id: str, markets: List[str]) -> Dict[str, Any]:
-    """Try with bookmaker KEYS first; if empty, retry without 'bookmakers'."""
-    base_params = {
-        "apiKey": API_KEY, "regions": "us", "oddsFormat": "american",
-        "markets": ",".join(markets),
-    }
+    """Try with bookmaker KEYS first; if empty, retry without 'bookmakers'. Thread-safe."""
+    with _odds_sem:
+        return _event_odds_once(event_id, markets)
+
+def _event_odds_once(event_id: str, markets: List[str]) -> Dict[str, Any]:
+    base_params = {**_BASE_PARAMS, "markets": ",".join(markets)}
     params = dict(base_params)
     if PREFERRED_BOOKMAKER_KEYS:
-        params["bookmakers"] = ",".join(PREFERRED_BOOKMAKER_KEYS)
-    r = requests.get(f"{BASE}/v4/sports/baseball_mlb/events/{event_id}/odds", params=params, timeout=20)
-    r.raise_for_status()
-    data = r.json() or {}
+        params["bookmakers"] = _PREFERRED_CSV
+    url = f"{BASE}/v4/sports/baseball_mlb/events/{event_id}/odds"
+    data = _get_json_cached(url, params) or {}
     if not (data.get("bookmakers") or []):
-        r2 = requests.get(f"{BASE}/v4/sports/baseball_mlb/events/{event_id}/odds", params=base_params, timeout=20)
-        r2.raise_for_status()
-        data = r2.json() or {}
+        data = _get_json_cached(url, base_params) or {}
     return data
 
+# ---------- async event-odds path ----------
+_RETRY_STATUS = (429, 502, 503, 504)  # SESSION's status_forcelist
+
+@asynccontextmanager
+async def _odds_slot():
+    """Hold one of the process-wide _odds_sem permits from async code, so
+    overlapping refreshes share the ODDS_CONCURRENCY cap with the sync path."""
+    if not _odds_sem.acquire(blocking=False):
+        fut = asyncio.ensure_future(asyncio.to_thread(_odds_sem.acquire))
+        try:
+            await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            fut.add_done_callback(lambda _: _odds_sem.release())  # the thread still gets it
+            raise
+    try:
+        yield
+    finally:
+        _odds_sem.release()
+
+async def _aget_json(client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> Any:
+    """GET with the same retry policy as SESSION (3 retries, 0.3s backoff on 429/5xx) and ETag revalidation."""
+    sig = _etag_sig(url, params)
+    headers = _etag_headers(sig)
+    for i in range(4):
+        r = await client.get(url, params=params, headers=headers)
+        if r.status_code not in _RETRY_STATUS or i == 3:
+            break
+        await asyncio.sleep(0.3 * (2 ** i))
+    if r.status_code != 304:
+        r.raise_for_status()
+    return _etag_body(sig, r.status_code, r.headers, r.content)
+
+async def _event_odds_async(client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                            event_id: str, markets: List[str]) -> Dict[str, Any]:
+    """Async twin of _event_odds."""
+    url = f"{BASE}/v4/sports/baseball_mlb/events/{event_id}/odds"
+    base_params = {**_BASE_PARAMS, "markets": ",".join(markets)}
+    params = dict(base_params)
+    if PREFERRED_BOOKMAKER_KEYS:
+        params["bookmakers"] = _PREFERRED_CSV
+    async with sem, _odds_slot():
+        data = await _aget_json(client, url, params) or {}
+        if not (data.get("bookmakers") or []):
+            data = await _aget_json(client, url, base_params) or {}
+    return data
+
+async def _aevent_batches(tasks: List[Tuple[str, int]], all_markets: List[List[str]]) -> List[Any]:
+    sem = asyncio.Semaphore(ODDS_CONCURRENCY)
+    limits = httpx.Limits(max_keepalive_connections=20, max_connections=20)
+    async with httpx.AsyncClient(limits=limits, timeout=20) as client:
+        return await asyncio.gather(*[
+            _event_odds_async(client, sem, eid, all_markets[b]) for eid, b in tasks
+        ], return_exceptions=True)
+
+def _fetch_event_batches(tasks: List[Tuple[str, int]], all_markets: List[List[str]]) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    """
+    Odds for every (event_id, batch_idx) task, fetched concurrently on one
+    event loop. Inside a running loop this falls back to the thread pool.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        results = asyncio.run(_aevent_batches(tasks, all_markets))
+    else:
+        with ThreadPoolExecutor(max_workers=min(12, len(tasks))) as ex:
+            futures = [ex.submit(_event_odds, eid, all_markets[b]) for eid, b in tasks]
+            results = []
+            for fut in futures:
+                try:
+                    results.append(fut.result())
+                except Exception as e:
+                    results.append(e)
+
+    batch_data: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for (eid, batch_idx), res in zip(tasks, results):
+        if isinstance(res, BaseException):
+            print(f"[ERROR] Failed to fetch props for event {eid} batch {batch_idx}: {res}")
+        else:
+            batch_data[(eid, batch_idx)] = res
+    return batch_data
+
 def get_favored_team(game):
     """
     Determine the favored team based on moneyline odds
@@ -240,11 +517,6 @@ def get_favored_team(game):
 
 def parse_game_data():
     """Fetch moneylines with preferred sportsbooks first, fallback to all if needed"""
-    now = datetime.utcnow()
-    future = now + timedelta(hours=48)
-    start_time = now.replace(microsecond=0).isoformat() + "Z"
-    end_time = future.replace(microsecond=0).isoformat() + "Z"
-
     if not API_KEY:
         print("[ERROR] ODDS_API_KEY is not set")
         return []
@@ -252,21 +524,7 @@ def parse_game_data():
     # Try preferred sportsbooks first
     try:
         print(f"[DEBUG] Fetching moneylines from preferred sportsbooks: {PREFERRED_BOOKMAKER_KEYS}")
-        response = requests.get(
-            f"{BASE}/v4/sports/baseball_mlb/odds",
-            params={
-                "apiKey": API_KEY,
-                "regions": "us",
-                "markets": "h2h",
-                "oddsFormat": "american",
-                "commenceTimeFrom": start_time,
-                "commenceTimeTo": end_time,
-                "bookmakers": ",".join(PREFERRED_BOOKMAKER_KEYS)
-            },
-            timeout=20
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json_cached(f"{BASE}/v4/sports/baseball_mlb/odds", _odds_params("h2h"))
         print(f"[INFO] Retrieved {len(data)} moneyline matchups from preferred sportsbooks")
         
         # If we got good data, return it
@@ -281,20 +539,7 @@ def parse_game_data():
     # Fallback to all sportsbooks
     try:
         print("[DEBUG] Fetching moneylines from all sportsbooks")
-        response = requests.get(
-            f"{BASE}/v4/sports/baseball_mlb/odds",
-            params={
-                "apiKey": API_KEY,
-                "regions": "us",
-                "markets": "h2h",
-                "oddsFormat": "american",
-                "commenceTimeFrom": start_time,
-                "commenceTimeTo": end_time
-            },
-            timeout=20
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json_cached(f"{BASE}/v4/sports/baseball_mlb/odds", _odds_params("h2h", preferred=False))
         print(f"[INFO] Retrieved {len(data)} moneyline matchups from all sportsbooks")
         return data
     except Exception as e:
@@ -305,31 +550,12 @@ def get_matchup_map():
     """Get today's games with accurate team matchups from Odds API"""
     from team_abbreviations import TEAM_ABBREVIATIONS
     
-    now = datetime.utcnow()
-    future = now + timedelta(hours=48)
-    start_time = now.replace(microsecond=0).isoformat() + "Z"
-    end_time = future.replace(microsecond=0).isoformat() + "Z"
-
     if not API_KEY:
         print("[ERROR] ODDS_API_KEY is not set")
         return {}
 
     try:
-        response = requests.get(
-            f"{BASE}/v4/sports/baseball_mlb/odds",
-            params={
-                "apiKey": API_KEY,
-                "regions": "us",
-                "markets": "h2h",
-                "oddsFormat": "american",
-                "commenceTimeFrom": start_time,
-                "commenceTimeTo": end_time,
-                "bookmakers": ",".join(PREFERRED_BOOKMAKER_KEYS)
-            },
-            timeout=20
-        )
-        response.raise_for_status()
-        games = response.json()
+        games = _get_json_cached(f"{BASE}/v4/sports/baseball_mlb/odds", _odds_params("h2h"))
         
         matchup_map = {}
         for game in games:
@@ -358,32 +584,13 @@ def get_matchup_map():
 
 def get_mlb_totals_odds():
     """Fetch over/under totals odds for MLB games"""
-    now = datetime.utcnow()
-    future = now + timedelta(hours=48)
-    start_time = now.replace(microsecond=0).isoformat() + "Z"
-    end_time = future.replace(microsecond=0).isoformat() + "Z"
-
     if not API_KEY:
         print("[ERROR] ODDS_API_KEY is not set")
         return []
 
     try:
         print("[DEBUG] Fetching MLB totals odds")
-        response = requests.get(
-            f"{BASE}/v4/sports/baseball_mlb/odds",
-            params={
-                "apiKey": API_KEY,
-                "regions": "us",
-                "markets": "totals",
-                "oddsFormat": "american",
-                "commenceTimeFrom": start_time,
-                "commenceTimeTo": end_time,
-                "bookmakers": ",".join(PREFERRED_BOOKMAKER_KEYS)
-            },
-            timeout=20
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = _get_json_cached(f"{BASE}/v4/sports/baseball_mlb/odds", _odds_params("totals"))
         print(f"[INFO] Retrieved totals odds for {len(data)} MLB games")
         return data
         
@@ -411,32 +618,22 @@ def get_mlb_game_environment_map():
             away_abbr = TEAM_ABBREVIATIONS.get(away_team, away_team)
             matchup_key = f"{away_abbr} @ {home_abbr}"
             
-            # Extract moneyline odds
-            for bookmaker in game.get("bookmakers", []):
-                for market in bookmaker.get("markets", []):
-                    if market.get("key") == "h2h":  # head-to-head (moneyline)
-                        outcomes = market.get("outcomes", [])
-                        
-                        home_odds = None
-                        away_odds = None
-                        
-                        for outcome in outcomes:
-                            if outcome.get("name") == home_team:
-                                home_odds = outcome.get("price")
-                            elif outcome.get("name") == away_team:
-                                away_odds = outcome.get("price")
-                        
-                        if home_odds and away_odds:
-                            # Determine favored team
-                            favored_team = home_abbr if home_odds < away_odds else away_abbr
-                            
-                            moneyline_lookup[matchup_key] = {
-                                "home_odds": home_odds,
-                                "away_odds": away_odds,
-                                "favored_team": favored_team
-                            }
-                            break
-                if matchup_key in moneyline_lookup:
+            # Extract moneyline odds: first head-to-head market priced on both sides
+            h2h_markets = (m for bk in game.get("bookmakers", []) for m in bk.get("markets", [])
+                           if m.get("key") == "h2h")
+            for market in h2h_markets:
+                prices = {o.get("name"): o.get("price") for o in market.get("outcomes", [])}
+                home_odds = prices.get(home_team)
+                away_odds = prices.get(away_team)
+                if home_odds and away_odds:
+                    # Determine favored team
+                    favored_team = home_abbr if home_odds < away_odds else away_abbr
+                    
+                    moneyline_lookup[matchup_key] = {
+                        "home_odds": home_odds,
+                        "away_odds": away_odds,
+                        "favored_team": favored_team
+                    }
                     break
 
     for game in totals_data:
@@ -452,82 +649,68 @@ def get_mlb_game_environment_map():
             away_abbr = TEAM_ABBREVIATIONS.get(away_team, away_team)
             matchup_key = f"{away_abbr} @ {home_abbr}"
                 
-            # Find totals market in bookmakers
-            for bookmaker in game.get("bookmakers", []):
-                for market in bookmaker.get("markets", []):
-                    if market.get("key") == "totals":
-                        outcomes = market.get("outcomes", [])
-                        
-                        total_point = None
-                        over_odds = None
-                        under_odds = None
-                        
-                        for outcome in outcomes:
-                            if outcome.get("name") == "Over":
-                                total_point = outcome.get("point")
-                                over_odds = outcome.get("price")
-                            elif outcome.get("name") == "Under":
-                                under_odds = outcome.get("price")
-                        
-                        if total_point and over_odds and under_odds:
-                            label = classify_game_environment(total_point, over_odds, under_odds)
+            # Find totals market in bookmakers: first one with a line and both prices
+            totals_markets = ((bk, m) for bk in game.get("bookmakers", []) for m in bk.get("markets", [])
+                              if m.get("key") == "totals")
+            for bookmaker, market in totals_markets:
+                by_name = {o.get("name"): o for o in market.get("outcomes", [])}
+                over = by_name.get("Over") or {}
+                under = by_name.get("Under") or {}
+                total_point = over.get("point")
+                over_odds = over.get("price")
+                under_odds = under.get("price")
+
+                if total_point and over_odds and under_odds:
+                    label = classify_game_environment(total_point, over_odds, under_odds)
                             
-                            # Get favored team from moneyline lookup
-                            moneyline_info = moneyline_lookup.get(matchup_key, {})
-                            favored_team = moneyline_info.get("favored_team")
+                    # Get favored team from moneyline lookup
+                    moneyline_info = moneyline_lookup.get(matchup_key, {})
+                    favored_team = moneyline_info.get("favored_team")
                             
-                            # Calculate no-vig probabilities for moneyline
-                            home_best, away_best = best_two_sided_prices([{
-                                "book": bookmaker.get("key", "").lower(),
-                                "home": moneyline_info.get("home_odds"),
-                                "away": moneyline_info.get("away_odds")
-                            }])
-                            home_fair, away_fair = (None, None)
-                            favorite = None
-                            if home_best is not None and away_best is not None:
-                                home_fair, away_fair = no_vig_two_way(home_best, away_best)
-                                if home_fair is not None and away_fair is not None:
-                                    favorite = "home" if home_fair > away_fair else "away"
-
-                            # Calculate no-vig probabilities for totals
-                            total_line, over_fair, under_fair = total_consensus([{
-                                "book": bookmaker.get("key", "").lower(),
-                                "line": total_point,
-                                "over": over_odds,
-                                "under": under_odds
-                            }])
-                            high_scoring = False
-                            if total_line is not None:
-                                # label high scoring by line OR fair prob of Over
-                                high_scoring = (total_line >= 9.0) or (over_fair is not None and over_fair > 0.55)
-
-                            env_map[matchup_key] = {
-                                "environment": label,
-                                "total": total_point,
-                                "over_odds": over_odds,
-                                "under_odds": under_odds,
-                                "favored_team": favored_team,
-                                "home_team": home_abbr,
-                                "away_team": away_abbr,
-                                "no_vig": {
-                                    "moneyline": {
-                                        "home_prob": round(home_fair, 3) if home_fair is not None else None,
-                                        "away_prob": round(away_fair, 3) if away_fair is not None else None,
-                                        "favorite": favorite  # "home"/"away"/None
-                                    },
-                                    "totals": {
-                                        "line": total_line,
-                                        "over_prob": round(over_fair, 3) if over_fair is not None else None,
-                                        "under_prob": round(under_fair, 3) if under_fair is not None else None,
-                                        "high_scoring": high_scoring
-                                    }
-                                }
+                    # Calculate no-vig probabilities for moneyline
+                    book_key = bookmaker.get("key", "").lower()
+                    home_best, away_best = _best_single(
+                        book_key, moneyline_info.get("home_odds"), moneyline_info.get("away_odds"))
+                    home_fair, away_fair = (None, None)
+                    favorite = None
+                    if home_best is not None and away_best is not None:
+                        home_fair, away_fair = no_vig_two_way(home_best, away_best)
+                        if home_fair is not None and away_fair is not None:
+                            favorite = "home" if home_fair > away_fair else "away"
+
+                    # Calculate no-vig probabilities for totals
+                    total_line, over_fair, under_fair = _total_single(
+                        book_key, total_point, over_odds, under_odds)
+                    high_scoring = False
+                    if total_line is not None:
+                        # label high scoring by line OR fair prob of Over
+                        high_scoring = (total_line >= 9.0) or (over_fair is not None and over_fair > 0.55)
+
+                    env_map[matchup_key] = {
+                        "environment": label,
+                        "total": total_point,
+                        "over_odds": over_odds,
+                        "under_odds": under_odds,
+                        "favored_team": favored_team,
+                        "home_team": home_abbr,
+                        "away_team": away_abbr,
+                        "no_vig": {
+                            "moneyline": {
+                                "home_prob": round(home_fair, 3) if home_fair is not None else None,
+                                "away_prob": round(away_fair, 3) if away_fair is not None else None,
+                                "favorite": favorite  # "home"/"away"/None
+                            },
+                            "totals": {
+                                "line": total_line,
+                                "over_prob": round(over_fair, 3) if over_fair is not None else None,
+                                "under_prob": round(under_fair, 3) if under_fair is not None else None,
+                                "high_scoring": high_scoring
                             }
+                        }
+                    }
                             
-                            fav_indicator = f" (Fav: {favored_team})" if favored_team else ""
-                            print(f"[ENV] {matchup_key}: {label} (Total: {total_point}){fav_indicator}")
-                            break
-                if matchup_key in env_map:
+                    fav_indicator = f" (Fav: {favored_team})" if favored_team else ""
+                    print(f"[ENV] {matchup_key}: {label} (Total: {total_point}){fav_indicator}")
                     break
                     
         except Exception as e:
@@ -539,27 +722,21 @@ def get_mlb_game_environment_map():
 
 def fetch_player_props():
     """Fetch player props with preferred sportsbooks first, fallback to all if needed"""
-    now = datetime.utcnow()
-    future = now + timedelta(hours=48)
-    start_time = now.replace(microsecond=0).isoformat() + "Z"
-    end_time = future.replace(microsecond=0).isoformat() + "Z"
+    start_time, end_time = _window_iso_utc()
 
     if not API_KEY:
         print("[ERROR] ODDS_API_KEY is not set")
         return []
 
     try:
-        event_resp = requests.get(
+        events = _get_json_cached(
             f"{BASE}/v4/sports/baseball_mlb/events",
-            params={
+            {
                 "apiKey": API_KEY,
                 "commenceTimeFrom": start_time,
                 "commenceTimeTo": end_time
-            },
-            timeout=20
+            }
         )
-        event_resp.raise_for_status()
-        events = event_resp.json()
         print(f"[INFO] Found {len(events)} events")
     except Exception as e:
         print(f"[ERROR] Failed to fetch MLB events: {e}")
@@ -567,6 +744,9 @@ def fetch_player_props():
 
     # Return flat list for backward compatibility
     all_props = []
+    # price columns parallel to all_props (0 = side missing) for the fair-odds pass
+    over_col: List[int] = []
+    under_col: List[int] = []
     print(f"[DEBUG] Starting prop collection for {len(events)} events")
     
     # Define available markets only (7 markets total) - confirmed working with API
@@ -577,6 +757,11 @@ def fetch_player_props():
     
     all_markets = [markets_batch_1, markets_batch_2]
 
+    # Fetch every (event, market batch) concurrently; pairing below stays sequential
+    tasks = [(eid, batch_idx) for eid in (e.get("id") for e in events) if eid
+             for batch_idx in range(len(all_markets))]
+    batch_data = _fetch_event_batches(tasks, all_markets) if tasks else {}
+
     for event in events:
         eid = event.get("id")
         if not eid:
@@ -590,31 +775,23 @@ def fetch_player_props():
         # Reset per-event aggregator
         sidebook = defaultdict(lambda: {"over": None, "under": None})
 
-        # Process each market batch to avoid rate limiting
         for batch_idx, markets in enumerate(all_markets):
-            try:
-                # Add delay between batches to respect rate limits
-                if batch_idx > 0:
-                    time.sleep(1)
-                
-                data = _event_odds(eid, markets)
-                
-                # Log successful market response
-                if data.get("bookmakers"):
-                    successful_markets = [m.get('key') for m in data.get('bookmakers', [])[0].get('markets', [])]
-                    print(f"[DEBUG] Event {eid} batch {batch_idx} fetched props for markets: {successful_markets}")
-                
-                # Use the new helper function to pair outcomes
-                for stat_key in markets:
-                    batch_sidebook = _pair_outcomes(data.get("bookmakers", []), stat_key)
-                    for key, sides in batch_sidebook.items():
-                        if sides["over"] or sides["under"]:
-                            sidebook[key] = sides
-                                
-            except Exception as e:
-                print(f"[ERROR] Failed to fetch props for event {eid} batch {batch_idx}: {e}")
+            data = batch_data.get((eid, batch_idx))
+            if data is None:
                 continue
 
+            # Log successful market response
+            if data.get("bookmakers"):
+                successful_markets = [m.get('key') for m in data.get('bookmakers', [])[0].get('markets', [])]
+                print(f"[DEBUG] Event {eid} batch {batch_idx} fetched props for markets: {successful_markets}")
+
+            # Use the new helper function to pair outcomes
+            for stat_key in markets:
+                batch_sidebook = _pair_outcomes(data.get("bookmakers", []), stat_key)
+                for key, sides in batch_sidebook.items():
+                    if sides["over"] or sides["under"]:
+                        sidebook[key] = sides
+
         # After scanning the event, build rows with fair odds calculation
         props_for_matchup = []
 
@@ -627,6 +804,7 @@ def fetch_player_props():
                 "stat":   stat_key,
                 "line":   point,
                 "matchup": matchup_key,
+                "fair":   {"prob": {"over": 0.0, "under": 0.0}},
             }
 
             # A) populate shop (for no-vig) + generic fallback fields
@@ -650,22 +828,19 @@ def fetch_player_props():
             # Add book slug for consistency
             row['book'] = (over or under or {}).get('book', '')
 
-            # B) compute True Odds FIRST (so we have non-zero fair.prob)
-            _attach_fair_or_implied(row)
-
-
-
             # Append to the list
             props_for_matchup.append(row)
+            over_col.append(int(over['price']) if over else 0)
+            under_col.append(int(under['price']) if under else 0)
 
-        # Finalize fair odds for this matchup
-        _finalize_fair(props_for_matchup)
-        
         # Add props to the flat list for backward compatibility
         all_props.extend(props_for_matchup)
         
         print(f"[DEBUG] Event {eid} ({matchup_key}): Collected {len(props_for_matchup)} props")
 
+    # True Odds for every row in one pass (0/0 rows are repaired in place)
+    _attach_fair_batch(all_props, over_col, under_col)
+
     print(f"[INFO] Final count of props: {len(all_props)}")
     print(f"[DEBUG] Final props fetched: {len(all_props)}")
     print(f"🔍 DEBUG: Fetched {len(all_props)} raw props from API")
@@ -684,27 +859,118 @@ def deduplicate_props(props):
     unique_props = {}
     
     for prop in props:
-        # Create unique key for each player+stat+line combination
-        key = f"{prop['player']}_{prop['stat']}_{prop['line']}"
-        
-        # If this is the first occurrence or has better odds, keep it
-        if key not in unique_props:
+        key = (prop['player'], prop['stat'], prop['line'])
+        prev = unique_props.get(key)
+        # Keep the better price: higher American odds pay more on either side of zero
+        if prev is None or prop['odds'] > prev['odds']:
             unique_props[key] = prop
-        else:
-            # Keep the prop with better odds (higher absolute value for positive odds)
-            current_odds = unique_props[key]['odds']
-            new_odds = prop['odds']
-            
-            # For positive odds, higher is better; for negative odds, closer to 0 is better
-            if (current_odds > 0 and new_odds > current_odds) or (current_odds < 0 and new_odds > current_odds):
-                unique_props[key] = prop
     
     deduplicated = list(unique_props.values())
     print(f"[INFO] Deduplication: {len(props)} props -> {len(deduplicated)} unique props")
     return deduplicated
 
-def enrich_prop(prop):
-    """Enrich a single prop with contextual and fantasy hit rates - with robust error handling"""
+def _player_ctx(player_name: str) -> Dict[str, Any]:
+    """Per-player lookups shared by every prop for that player (id, lineup slot)."""
+    try:
+        from enrichment import get_player_id, get_lineup_position_multiplier, cached_or_none
+        return {
+            "player_id": cached_or_none(lambda: get_player_id(player_name),
+                                        ("player_id", player_name), pos_ttl=3600),
+            "lineup_multiplier": get_lineup_position_multiplier(player_name),
+        }
+    except Exception as e:
+        print(f"[DEBUG] Player context failed for {player_name}: {e}")
+        return {}
+
+def _recompute_fair_totals(prop, over_price, under_price) -> None:
+    """enrich_prop's 0/0 repair: no-vig over/under (probability module math), set only if still empty."""
+    p_over, p_under = _pb_fair_probs(float(over_price), float(under_price))
+    if p_over is None:
+        return
+    prop.setdefault("fair", {})
+    prob = prop["fair"].setdefault("prob", {})
+    prob.setdefault("over", 0.0)
+    prob.setdefault("under", 0.0)
+    # Only set if not already computed
+    if not (prob.get("over") or prob.get("under")):
+        prob["over"] = round(p_over, 4)
+        prob["under"] = round(p_under, 4)
+        prop["fair"]["american"] = {
+            "over": _pb_fair_odds(p_over),
+            "under": _pb_fair_odds(p_under),
+        }
+
+_ENHANCE_LABELS = ("Park", "Form", "Bullpen", "Lineup")
+
+def _enhancement_factors(prop, player_ctx: Optional[Dict[str, Any]]) -> Tuple[float, float, float, float]:
+    """(park, form, bullpen, lineup) context multipliers for one prop; 1.0 = no effect."""
+    from enrichment import (apply_park_factor, get_recent_form_multiplier,
+                          get_bullpen_fatigue_multiplier)
+    if player_ctx is None:
+        player_ctx = _player_ctx(prop["player"])
+    park = form = bullpen = 1.0
+
+    # Park Factor Analysis
+    stadium = prop.get("venue", "")
+    if stadium:
+        # apply_park_factor is memoized on (stat_type, stadium), so pass the stat string
+        park = apply_park_factor((prop.get("stat") or "").lower(), stadium)
+
+    # Recent Form Analysis
+    player_id = player_ctx.get("player_id")
+    if player_id:
+        # memoized per FORM_TTL window in enrichment, never raises
+        form = get_recent_form_multiplier(player_id, prop["stat"])
+
+    # Bullpen Fatigue Context
+    opponent_team = prop.get("opponent_team", "")
+    if opponent_team:
+        bullpen = get_bullpen_fatigue_multiplier(opponent_team)
+
+    # Lineup Position Influence
+    return park, form, bullpen, player_ctx.get("lineup_multiplier", 1.0)
+
+def _attach_enhancement(player, contextual, base_hit_rate, factors, multiplier, enhanced_hit_rate) -> None:
+    """Write the enhanced hit rate (already capped and rounded) into the contextual dict."""
+    labels = [f"{name}: {m:.2f}" for name, m in zip(_ENHANCE_LABELS, factors) if m != 1.0]
+    contextual["enhanced_hit_rate"] = enhanced_hit_rate
+    contextual["enhancement_multiplier"] = multiplier
+    contextual["enhancement_factors"] = labels
+    contextual["original_hit_rate"] = base_hit_rate
+    if labels:
+        print(f"[ENHANCED] {player}: {base_hit_rate:.2f} -> {enhanced_hit_rate:.2f} ({', '.join(labels)})")
+
+def _apply_enhancements(rows: List[Dict[str, Any]]) -> None:
+    """
+    Context-multiplier math for every row enrich_prop deferred: product of the
+    four factors, times the base hit rate, clipped to [0.05, 0.95] -- one numpy
+    pass over the slate instead of per-prop float arithmetic.
+    """
+    todo = [row for row in rows if "_enhance" in row]
+    if not todo:
+        return
+    pending = [row.pop("_enhance") for row in todo]
+    if np is None:
+        for row, (base, f) in zip(todo, pending):
+            mult = f[0] * f[1] * f[2] * f[3]
+            _attach_enhancement(row["player"], row["contextual_hit_rate"], base, f,
+                                round(mult, 3), round(min(0.95, max(0.05, base * mult)), 3))
+        return
+    base = np.fromiter((b for b, _ in pending), dtype=np.float64, count=len(pending))
+    f = np.array([fs for _, fs in pending], dtype=np.float64).reshape(-1, 4)
+    mult = f[:, 0] * f[:, 1] * f[:, 2] * f[:, 3]
+    enhanced = np.clip(base * mult, 0.05, 0.95)
+    for row, (b, fs), m, e in zip(todo, pending, _round_nd(mult, 3).tolist(), _round_nd(enhanced, 3).tolist()):
+        try:
+            _attach_enhancement(row["player"], row["contextual_hit_rate"], b, fs, m, e)
+        except Exception as enhancement_error:
+            print(f"[DEBUG] Enhanced enrichment failed for {row.get('player')}: {enhancement_error}")
+
+def enrich_prop(prop, player_ctx: Optional[Dict[str, Any]] = None, defer_enhancement: bool = False):
+    """
+    Enrich a single prop with contextual and fantasy hit rates - with robust error handling.
+    defer_enhancement leaves the context-multiplier math to _apply_enhancements (batch).
+    """
     try:
         # Get contextual hit rate with fallback
         contextual = None
@@ -737,62 +1003,20 @@ def enrich_prop(prop):
             }
         
         # Enhanced Enrichment: Apply pro-level betting context multipliers
+        enhance = None
         try:
-            from enrichment import (apply_park_factor, get_recent_form_multiplier, 
-                                  get_bullpen_fatigue_multiplier, get_lineup_position_multiplier,
-                                  get_player_id)
-            
             base_hit_rate = contextual.get("hit_rate", 0.30)
-            enhanced_multiplier = 1.0
-            enhancement_factors = []
-            
-            # Park Factor Analysis
-            stadium = prop.get("venue", "")
-            if stadium:
-                # when calling apply_park_factor / recent_form multipliers, pass the stat string:
-                stat_type = (prop.get("stat") or "").lower()
-                prop_normalized = {"stat_type": stat_type}  # minimal shape
-                prop_normalized.update(prop)  # merge with original prop
-                park_multiplier = apply_park_factor(prop_normalized, stadium)
-                if park_multiplier != 1.0:
-                    enhanced_multiplier *= park_multiplier
-                    enhancement_factors.append(f"Park: {park_multiplier:.2f}")
-            
-            # Recent Form Analysis
-            player_id = get_player_id(prop["player"])
-            if player_id:
-                form_multiplier = get_recent_form_multiplier(player_id, prop["stat"])
-                if form_multiplier != 1.0:
-                    enhanced_multiplier *= form_multiplier
-                    enhancement_factors.append(f"Form: {form_multiplier:.2f}")
-            
-            # Bullpen Fatigue Context
-            opponent_team = prop.get("opponent_team", "")
-            if opponent_team:
-                bullpen_multiplier = get_bullpen_fatigue_multiplier(opponent_team)
-                if bullpen_multiplier != 1.0:
-                    enhanced_multiplier *= bullpen_multiplier
-                    enhancement_factors.append(f"Bullpen: {bullpen_multiplier:.2f}")
-            
-            # Lineup Position Influence
-            lineup_multiplier = get_lineup_position_multiplier(prop["player"])
-            if lineup_multiplier != 1.0:
-                enhanced_multiplier *= lineup_multiplier
-                enhancement_factors.append(f"Lineup: {lineup_multiplier:.2f}")
-            
-            # Apply enhanced multiplier to hit rate (cap between 0.05 and 0.95)
+            factors = _enhancement_factors(prop, player_ctx)
             if isinstance(base_hit_rate, (int, float)) and base_hit_rate > 0:
-                enhanced_hit_rate = min(0.95, max(0.05, base_hit_rate * enhanced_multiplier))
-                
-                # Update contextual data with enhanced analysis
-                contextual["enhanced_hit_rate"] = round(enhanced_hit_rate, 3)
-                contextual["enhancement_multiplier"] = round(enhanced_multiplier, 3)
-                contextual["enhancement_factors"] = enhancement_factors
-                contextual["original_hit_rate"] = base_hit_rate
-                
-                if enhancement_factors:
-                    print(f"[ENHANCED] {prop['player']}: {base_hit_rate:.2f} -> {enhanced_hit_rate:.2f} ({', '.join(enhancement_factors)})")
-            
+                if defer_enhancement:
+                    enhance = (base_hit_rate, factors)
+                else:
+                    park, form, bullpen, lineup = factors
+                    enhanced_multiplier = park * form * bullpen * lineup
+                    # cap between 0.05 and 0.95
+                    enhanced_hit_rate = min(0.95, max(0.05, base_hit_rate * enhanced_multiplier))
+                    _attach_enhancement(prop["player"], contextual, base_hit_rate, factors,
+                                        round(enhanced_multiplier, 3), round(enhanced_hit_rate, 3))
         except Exception as enhancement_error:
             print(f"[DEBUG] Enhanced enrichment failed for {prop['player']}: {enhancement_error}")
             # Continue with basic contextual data if enhancement fails
@@ -831,88 +1055,54 @@ def enrich_prop(prop):
             else:
                 # Fair odds were computed but are 0/0, try to recompute
                 try:
-                    from probability import fair_probs_from_two_sided, fair_odds_from_prob
-                    
-                    def _attach_fair(prop, over_price=None, under_price=None, home_price=None, away_price=None, fav_price=None, dog_price=None):
-                        def set_fair(pA, pB, sideA, sideB):
-                            if pA is None: return
-                            prop.setdefault("fair", {})
-                            prop["fair"].setdefault("prob", {})
-                            prop["fair"]["prob"].setdefault(sideA, 0.0)
-                            prop["fair"]["prob"].setdefault(sideB, 0.0)
-                            # Only set if not already computed
-                            if not (prop["fair"]["prob"].get(sideA) or prop["fair"]["prob"].get(sideB)):
-                                prop["fair"]["prob"][sideA] = round(pA,4)
-                                prop["fair"]["prob"][sideB] = round(pB,4)
-                                prop["fair"]["american"] = {
-                                    sideA: fair_odds_from_prob(pA),
-                                    sideB: fair_odds_from_prob(pB),
-                                }
-
-                        # Totals (Over/Under)
-                        if over_price is not None and under_price is not None:
-                            p_over, p_under = fair_probs_from_two_sided(float(over_price), float(under_price))
-                            set_fair(p_over, p_under, "over", "under")
-                            return
-
-                        # Moneyline (Home/Away)
-                        if home_price is not None and away_price is not None:
-                            p_home, p_away = fair_probs_from_two_sided(float(home_price), float(away_price))
-                            set_fair(p_home, p_away, "home", "away")
-                            return
-
-                        # Spread (Fav/Dog)
-                        if fav_price is not None and dog_price is not None:
-                            p_fav, p_dog = fair_probs_from_two_sided(float(fav_price), float(dog_price))
-                            set_fair(p_fav, p_dog, "favorite", "underdog")
-                            return
-
                     # Extract existing odds from current structure and attach fair probabilities
                     shop = prop.get("shop") or {}
-                    over_am = shop.get("over", {}).get("american")
-                    under_am = shop.get("under", {}).get("american")
-                    _attach_fair(prop, over_price=over_am, under_price=under_am)
+                    over_am = (shop.get("over") or {}).get("american")
+                    under_am = (shop.get("under") or {}).get("american")
+                    if over_am is not None and under_am is not None:
+                        _recompute_fair_totals(prop, over_am, under_am)
                     
                 except Exception as fair_error:
                     print(f"[DEBUG] Fair probability calculation failed for {prop.get('player', 'Unknown')}: {fair_error}")
                     # Continue without fair probabilities if calculation fails
         
-        # Return enriched prop
-        return {
-            **prop,
-            "contextual_hit_rate": contextual,
-            "fantasy_hit_rate": fantasy,
-            "enriched": True
-        }
+        # Return enriched prop (in place: props are fresh rows from fetch_player_props)
+        prop["contextual_hit_rate"] = contextual
+        prop["fantasy_hit_rate"] = fantasy
+        prop["enriched"] = True
+        if enhance is not None:
+            prop["_enhance"] = enhance  # popped by enrich_player_props
+        return prop
     except Exception as e:
         print(f"[ERROR] Failed to enrich prop for {prop.get('player', 'Unknown')}: {e}")
         # Return original prop with error indication
-        return {
-            **prop,
-            "contextual_hit_rate": {
-                "hit_rate": 0.30,
-                "confidence": "Low",
-                "error": "Enrichment failed"
-            },
-            "fantasy_hit_rate": {
-                "hit_rate": 0.35,
-                "confidence": "Low",
-                "error": "Enrichment failed"
-            },
-            "enriched": False,
-            "error": str(e)
+        prop["contextual_hit_rate"] = {
+            "hit_rate": 0.30,
+            "confidence": "Low",
+            "error": "Enrichment failed"
+        }
+        prop["fantasy_hit_rate"] = {
+            "hit_rate": 0.35,
+            "confidence": "Low",
+            "error": "Enrichment failed"
         }
+        prop["enriched"] = False
+        prop["error"] = str(e)
+        return prop
 
 def enrich_player_props(props):
-    """Enrich player props with contextual and fantasy hit rates using parallel processing"""
+    """Enrich player props (in place) with contextual and fantasy hit rates using parallel processing"""
     if not props:
         return []
     
     print(f"[INFO] Starting enrichment for {len(props)} props")
     
-    # Use ThreadPoolExecutor for parallel processing
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        enriched_props = list(executor.map(enrich_prop, props))
+    # I/O-bound: resolve each player once, then enrich every prop against that context
+    players = list(dict.fromkeys(p.get("player") for p in props))
+    ctx_by_player = dict(zip(players, _ENRICH_POOL.map(_player_ctx, players)))
+    enriched_props = list(_ENRICH_POOL.map(
+        lambda p: enrich_prop(p, ctx_by_player.get(p.get("player")), defer_enhancement=True), props))
+    _apply_enhancements(enriched_props)
     
     # Count successful enrichments
     successful_enrichments = sum(1 for prop in enriched_props if prop.get("enriched", False))
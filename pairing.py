@@ -1,9 +1,17 @@
 """
 No-Vig Mode: Market pairing and prop building without enrichment
 """
+import heapq
 from collections import defaultdict
+from operator import itemgetter
 from typing import Dict, List, Any, Optional, Tuple
-from novig import american_to_prob, novig_two_way
+from novig import american_to_prob
+from probability import american_to_prob_arr
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 DEFAULT_BOOKS = ["draftkings", "fanduel", "betmgm"]
 
@@ -18,6 +26,33 @@ ALLOWED_MARKETS = {
     }
 }
 
+_first = itemgetter(0)
+
+def _p_over(prop: Dict[str, Any]) -> float:
+    # fair.prob.over is always a float here (rounded in pairing)
+    return prop["fair"]["prob"]["over"]
+
+def _implied_table(prices) -> Dict[int, Optional[float]]:
+    """
+    american_to_prob for every distinct price in one numpy pass (same IEEE
+    arithmetic, so identical floats). A slate repeats a few hundred prices
+    across thousands of (prop, book) sides, so pairing reads this table
+    instead of calling american_to_prob per side.
+    """
+    prices = list(prices)
+    if np is None:
+        return {v: american_to_prob(v) for v in prices}
+    table = dict(zip(prices, american_to_prob_arr(prices).tolist()))
+    table.pop(0, None)
+    return table
+
+def _novig_pair(pO: Optional[float], pU: Optional[float]) -> Tuple[float, Optional[float], Optional[float]]:
+    """(overround, p_over, p_under) for one book's two implied probabilities; novig_two_way rounding."""
+    overround = max(0.0, ((pO or 0.0) + (pU or 0.0)) - 1.0)
+    if pO is None or pU is None:
+        return overround, None, None
+    return overround, round(pO / (pO + pU), 4), round(pU / (pO + pU), 4)
+
 def _market_ok(league: str, stat: str, line: float) -> bool:
     rng = ALLOWED_MARKETS.get(league, {}).get(stat)
     if not rng: return False
@@ -39,7 +74,8 @@ def build_props_novig(
     default_overround: float = 0.04,
     # new knobs for confidence
     prefer_side: str = "over",           # "over" or "any"
-    high_threshold: float = 0.70         # tag >= this as high confidence
+    high_threshold: float = 0.70,        # tag >= this as high confidence
+    top_k: Optional[int] = None          # keep only the k highest-over props per matchup
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
     Returns { matchup: [ {player, stat, line, odds, shop, fair:{book,prob{over,under}}, meta{...}, priority_score} ] }
@@ -50,37 +86,57 @@ def build_props_novig(
     """
     books = [b.lower() for b in (prefer_books or DEFAULT_BOOKS)]
     # Aggregate by (event,matchup,player,stat,line)
-    by_prop: Dict[Tuple, Dict[str, Dict[str, int]]] = defaultdict(lambda: defaultdict(dict))
+    # Flat: (event,matchup,player,stat,line,book) -> {side: odds}; books_per_prop
+    # lists each prop's (book, sides) in first-seen order for the pairing pass.
+    by_side: Dict[Tuple, Dict[str, int]] = {}
+    books_per_prop: Dict[Tuple, List[Tuple[str, Dict[str, int]]]] = {}
     # Measure overround by book from fully paired lines
     book_overround_sum: Dict[str, float] = defaultdict(float)
     book_overround_n: Dict[str, int] = defaultdict(int)
 
+    # Offer filters, resolved once per distinct raw book name / (stat, line)
+    # rather than lower()+list scan and _market_ok's float parse per offer
+    books_set = frozenset(books)
+    book_norm: Dict[Any, Optional[str]] = {}
+    market_ok: Dict[Tuple, bool] = {}
+
     for o in raw_offers:
-        book = (o.get("book") or "").lower()
-        if book not in books: 
+        raw_book = o.get("book")
+        book = book_norm.get(raw_book, "")
+        if book == "":
+            book = (raw_book or "").lower()
+            book = book_norm[raw_book] = book if book in books_set else None
+        if book is None:
             continue
         stat = o.get("stat"); line = o.get("line")
-        if stat is None or line is None or not _market_ok(league, stat, line):
+        if stat is None or line is None:
             continue
-        k = (o["event_key"], o["matchup"], o["player"], stat, line)
+        ok = market_ok.get((stat, line))
+        if ok is None:
+            ok = market_ok[(stat, line)] = _market_ok(league, stat, line)
+        if not ok:
+            continue
+        k = (o["event_key"], o["matchup"], o["player"], stat, line, book)
         side = (o.get("side") or "").lower()
         if side in ("over","under") and o.get("odds") is not None:
-            by_prop[k][book][side] = int(o["odds"])
+            sides = by_side.get(k)
+            if sides is None:
+                sides = by_side[k] = {}
+                books_per_prop.setdefault(k[:5], []).append((book, sides))
+            sides[side] = int(o["odds"])
 
-    # Overround per book
-    for _, bookmap in by_prop.items():
-        for b, sides in bookmap.items():
-            if "over" in sides and "under" in sides:
-                pO = american_to_prob(sides["over"]) or 0.0
-                pU = american_to_prob(sides["under"]) or 0.0
-                overround = max(0.0, (pO + pU) - 1.0)
-                book_overround_sum[b] += overround
-                book_overround_n[b] += 1
+    implied = _implied_table({v for sides in by_side.values() for v in sides.values()})
 
-    avg_overround = {
-        b: (book_overround_sum[b] / book_overround_n[b]) if book_overround_n[b] else default_overround
-        for b in books
-    }
+    # Per-book overround from fully paired lines is accumulated during the
+    # candidate pass below; averages are taken lazily once it has finished.
+    avg_overround: Dict[str, float] = {}
+
+    def _avg_overround(b: str) -> float:
+        r = avg_overround.get(b)
+        if r is None:
+            n = book_overround_n.get(b)
+            r = avg_overround.setdefault(b, book_overround_sum[b] / n if n else default_overround)
+        return r
 
     out: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
 
@@ -107,81 +163,115 @@ def build_props_novig(
         prop["priority_score"] = round( (base * 2.0) + bonus, 6)  # roughly [-1, +3]
         return prop
 
-    for (ek, mu, pl, st, ln), bookmap in by_prop.items():
+    def _single_side(mu, pl, st, ln, bookmap) -> Optional[Dict[str, Any]]:
+        """Single-side fallback: estimate the missing side by the book's avg overround."""
+        for b, sides in bookmap:
+            r = _avg_overround(b)
+            if "over" in sides and "under" not in sides:
+                pO = implied.get(sides["over"]) or 0.0
+                p_over = max(0.01, min(0.99, round(pO / (1.0 + r), 4)))
+                p_under = round(1.0 - p_over, 4)
+                cand = {
+                    "matchup": mu, "player": pl, "stat": st, "line": ln,
+                    "odds": sides["over"], "shop": b,
+                    "fair": {"book": "single_side", "prob": {"over": p_over, "under": p_under}},
+                    "meta": {"paired": "single_side", "assumed_overround": r}
+                }
+                return _decorate(cand, "single_side")
+            if "under" in sides and "over" not in sides:
+                pU = implied.get(sides["under"]) or 0.0
+                p_under = max(0.01, min(0.99, round(pU / (1.0 + r), 4)))
+                p_over = round(1.0 - p_under, 4)
+                cand = {
+                    "matchup": mu, "player": pl, "stat": st, "line": ln,
+                    "odds": sides["under"], "shop": b,
+                    "fair": {"book": "single_side", "prob": {"over": p_over, "under": p_under}},
+                    "meta": {"paired": "single_side", "assumed_overround": r}
+                }
+                return _decorate(cand, "single_side")
+        return None
+
+    # (over, under) price pair -> (overround, p_over, p_under); a slate repeats
+    # a handful of pairs (-110/-110, ...), so each is divided and rounded once
+    novig_memo: Dict[Tuple[int, int], Tuple[float, Optional[float], Optional[float]]] = {}
+    pending: List[Tuple[str, int, Tuple]] = []
+    for (ek, mu, pl, st, ln), bookmap in books_per_prop.items():
         best = None
         best_score = -1.0
 
-        # 1) within-book pairing (gold)
-        for b, sides in bookmap.items():
+        # 1) within-book pairing (gold): pick the winner by score, then build
+        # and decorate only that one
+        win = None
+        for b, sides in bookmap:
             if "over" in sides and "under" in sides:
-                p_over, p_under = novig_two_way(sides["over"], sides["under"])
+                pair = (sides["over"], sides["under"])
+                nv = novig_memo.get(pair)
+                if nv is None:
+                    nv = novig_memo[pair] = _novig_pair(implied.get(pair[0]), implied.get(pair[1]))
+                overround, p_over, p_under = nv
+                book_overround_sum[b] += overround
+                book_overround_n[b] += 1
                 if p_over is None:
                     continue
                 score = abs(p_over - 0.5)
-                cand = {
-                    "matchup": mu, "player": pl, "stat": st, "line": ln,
-                    "odds": sides["over"], "shop": b,
-                    "fair": {"book": b, "prob": {"over": p_over, "under": p_under}},
-                }
                 if score > best_score:
-                    best, best_score = _decorate(cand, "novig"), score
+                    win, best_score = (b, sides["over"], p_over, p_under), score
+        if win:
+            b, oOdds, p_over, p_under = win
+            best = _decorate({
+                "matchup": mu, "player": pl, "stat": st, "line": ln,
+                "odds": oOdds, "shop": b,
+                "fair": {"book": b, "prob": {"over": p_over, "under": p_under}},
+            }, "novig")
 
-        # 2) cross-book pairing (same line)
+        # 2) cross-book pairing (same line). The unrounded score
+        # |pO/(pO+pU) - 0.5| rises with pO and falls with pU, so the best pair
+        # is (max pO, min pU) or (min pO, max pU): two candidates instead of
+        # every over x under. Scores are compared before rounding, so the
+        # winner is the true best pair (earliest in book order on exact ties);
+        # only its probabilities are rounded. Unpriced (0) sides are skipped,
+        # as novig_two_way does within-book.
         if not best:
             if allow_crossbook:
-                overs = [(b, v["over"]) for b,v in bookmap.items() if "over" in v]
-                unders = [(b, v["under"]) for b,v in bookmap.items() if "under" in v]
-                for bO, oOdds in overs:
-                    for bU, uOdds in unders:
-                        pO = american_to_prob(oOdds) or 0.0
-                        pU = american_to_prob(uOdds) or 0.0
+                overs = [(implied[v["over"]], i, b, v["over"]) for i, (b, v) in enumerate(bookmap) if v.get("over")]
+                unders = [(implied[v["under"]], i, b, v["under"]) for i, (b, v) in enumerate(bookmap) if v.get("under")]
+                if overs and unders:
+                    pairs = sorted(((max(overs, key=_first), min(unders, key=_first)),
+                                    (min(overs, key=_first), max(unders, key=_first))),
+                                   key=lambda ou: (ou[0][1], ou[1][1]))
+                    for (pO, _, bO, oOdds), (pU, _, bU, uOdds) in pairs:
                         s = pO + pU
                         if s <= 0: 
                             continue
-                        p_over = round(pO / s, 4); p_under = round(pU / s, 4)
-                        score = abs(p_over - 0.5)
-                        cand = {
+                        score = abs(pO / s - 0.5)
+                        if score > best_score:
+                            win, best_score = (bO, oOdds, bU, pO / s, pU / s), score
+                    if win:
+                        bO, oOdds, bU, p_over, p_under = win
+                        p_over, p_under = round(p_over, 4), round(p_under, 4)
+                        best = _decorate({
                             "matchup": mu, "player": pl, "stat": st, "line": ln,
                             "odds": oOdds, "shop": f"{bO}~{bU}",
                             "fair": {"book": "crossbook", "prob": {"over": p_over, "under": p_under}},
                             "meta": {"paired": "crossbook", "over_book": bO, "under_book": bU}
-                        }
-                        if score > best_score:
-                            best, best_score = _decorate(cand, "crossbook"), score
+                        }, "crossbook")
 
-        # 3) single-side fallback (estimate missing side by avg overround)
+        # 3) single-side fallback -- needs the final overround averages, so
+        # keep this prop's slot and fill it after the pass
         if not best and allow_single_side_fallback:
-            for b, sides in bookmap.items():
-                r = avg_overround.get(b, default_overround)
-                if "over" in sides and "under" not in sides:
-                    pO = american_to_prob(sides["over"]) or 0.0
-                    p_over = max(0.01, min(0.99, round(pO / (1.0 + r), 4)))
-                    p_under = round(1.0 - p_over, 4)
-                    cand = {
-                        "matchup": mu, "player": pl, "stat": st, "line": ln,
-                        "odds": sides["over"], "shop": b,
-                        "fair": {"book": "single_side", "prob": {"over": p_over, "under": p_under}},
-                        "meta": {"paired": "single_side", "assumed_overround": r}
-                    }
-                    best = _decorate(cand, "single_side")
-                    break
-                if "under" in sides and "over" not in sides:
-                    pU = american_to_prob(sides["under"]) or 0.0
-                    p_under = max(0.01, min(0.99, round(pU / (1.0 + r), 4)))
-                    p_over = round(1.0 - p_under, 4)
-                    cand = {
-                        "matchup": mu, "player": pl, "stat": st, "line": ln,
-                        "odds": sides["under"], "shop": b,
-                        "fair": {"book": "single_side", "prob": {"over": p_over, "under": p_under}},
-                        "meta": {"paired": "single_side", "assumed_overround": r}
-                    }
-                    best = _decorate(cand, "single_side")
-                    break
+            pending.append((mu, len(out[mu]), (mu, pl, st, ln, bookmap)))
+            out[mu].append(None)
+            continue
 
         if best:
             out[mu].append(best)
 
-    def _p_over(prop): return float(prop["fair"]["prob"]["over"])
+    for mu, i, args in pending:
+        out[mu][i] = _single_side(*args)
+    for mu in {mu for mu, _, _ in pending}:
+        out[mu] = [p for p in out[mu] if p is not None]
+        if not out[mu]:
+            del out[mu]
 
     # optional: pass in `over_only=True` from the route to hide low OVERs
     if locals().get("over_only", False):
@@ -189,8 +279,12 @@ def build_props_novig(
             out[mu] = [p for p in out[mu] if _p_over(p) >= 0.50]  # you can bump to your min_prob
             if not out[mu]: del out[mu]
 
-    # strict over-first sort
+    # strict over-first sort; top_k keeps only the best k per matchup
+    # (nlargest is a partial sort, same order and tie-breaks as the full one)
     for mu in out:
-        out[mu].sort(key=_p_over, reverse=True)
+        if top_k is not None:
+            out[mu] = heapq.nlargest(top_k, out[mu], key=_p_over)
+        else:
+            out[mu].sort(key=_p_over, reverse=True)
 
     return out
@@ -1,6 +1,11 @@
 import logging
 from functools import reduce
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 logger = logging.getLogger(__name__)
 
 def implied_probability(odds):
@@ -158,4 +163,13 @@ def no_vig_two_way(odds_a, odds_b):
     s = pa + pb
     if s == 0: 
         return None, None
-    return pa/s, pb/s
\ No newline at end of file
+    return pa/s, pb/s
+
+def american_to_prob_arr(odds):
+    """
+    american_to_prob over an array of American prices (numpy required);
+    0 (no price) maps to 0.0. Same float arithmetic as the scalar helper.
+    """
+    a = np.asarray(odds, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(a > 0, 100.0 / (a + 100.0), np.where(a < 0, -a / (100.0 - a), 0.0))
@@ -1,5 +1,11 @@
+from functools import lru_cache
 from typing import List, Dict, Any
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def _passes_line(value: float, line) -> bool:
     try:
         return float(value) >= float(line)
@@ -30,17 +36,20 @@ MARKET_TO_STAT = {
     "player_outs": "outs",            # sometimes used for pitching outs
 }
 
-def _extract_value(game: dict, market: str) -> float:
-    # Normalize the market into a StatsAPI game key
+@lru_cache(maxsize=256)
+def _resolve_stat_key(market: str) -> str:
+    """Normalize a market into a StatsAPI game key (memoized per market)."""
     # 1) exact mapping
     stat_key = MARKET_TO_STAT.get(market)
     if not stat_key:
         # 2) fallback: strip common prefixes and try again
-        stripped = market.replace("player_", "").replace("batter_", "")
+        stripped = market.removeprefix("player_").removeprefix("batter_")
         stat_key = MARKET_TO_STAT.get(stripped, stripped)
+    return stat_key
 
+def _extract_value(game: dict, market: str) -> float:
     # pull from the game dict; StatsAPI uses camelCase for many fields
-    raw = game.get(stat_key, 0)
+    raw = game.get(_resolve_stat_key(market), 0)
     try:
         return float(raw or 0)
     except Exception:
@@ -67,4 +76,38 @@ def summarize_l10(games: List[Dict[str, Any]], market: str, line) -> Dict[str, A
     n = len(last)
     avg = round(sum(vals)/n, 3)
     over_rate = round(over_cnt/n, 3)
-    return {"count": n, "over_rate": over_rate, "avg": avg, "series": series} 
\ No newline at end of file
+    return {"count": n, "over_rate": over_rate, "avg": avg, "series": series} 
+
+def summarize_l10_batch(games_by_player: Dict[str, List[Dict[str, Any]]], market: str, line) -> Dict[str, Dict[str, Any]]:
+    """
+    summarize_l10 for many players at once -> {player: summary}. Last-10 values
+    are stacked into one (players x 10) array so the over-the-line test and
+    counts come from a single numpy pass instead of a Python loop per player.
+    """
+    if np is None:
+        return {p: summarize_l10(g, market, line) for p, g in games_by_player.items()}
+    try:
+        ln = float(line)
+    except (TypeError, ValueError):
+        ln = None  # _passes_line: an unparseable line never passes
+
+    players = list(games_by_player)
+    lasts = [(games_by_player[p] or [])[-10:] for p in players]
+    vals = np.zeros((len(players), 10), dtype=np.float64)
+    for i, last in enumerate(lasts):
+        vals[i, :len(last)] = [_extract_value(g, market) for g in last]
+    n = np.fromiter((len(last) for last in lasts), dtype=np.int64, count=len(lasts))
+    over = (vals >= ln) & (np.arange(10) < n[:, None]) if ln is not None else np.zeros(vals.shape, dtype=bool)
+    over_cnt = over.sum(axis=1).tolist()
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for p, last, k, cnt, row, mask in zip(players, lasts, n.tolist(), over_cnt, vals.tolist(), over.tolist()):
+        if not k:
+            out[p] = {"count": 0, "over_rate": None, "avg": None, "series": []}
+            continue
+        series = [{"date": g.get("date"), "opp": g.get("opponent"), "value": v, "over": ok}
+                  for g, v, ok in zip(last, row, mask)]
+        # Python's left-to-right sum, not numpy's pairwise one, so avg rounds
+        # exactly as in summarize_l10
+        out[p] = {"count": k, "over_rate": round(cnt/k, 3), "avg": round(sum(row[:k])/k, 3), "series": series}
+    return out
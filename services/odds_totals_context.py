@@ -1,8 +1,11 @@
 # services/odds_totals_context.py
+import threading
+from functools import lru_cache
 from typing import Dict, Any, Optional, Tuple, List
 
 PREFERRED_BOOKS = ["fanduel","draftkings","betmgm","caesars","pointsbetus"]
 
+@lru_cache(maxsize=2048)  # a slate quotes a few hundred distinct prices
 def american_to_prob(american: Optional[int]) -> float:
     if american is None: return 0.0
     a = int(american)
@@ -24,7 +27,42 @@ TOTAL_UNDER_STRONG = 0.58     # => Low-Scoring
 TOTAL_NEUTRAL_LO = 0.48
 TOTAL_NEUTRAL_HI = 0.54
 
+# Memo of computed contexts. The key carries every book's last_update, so a
+# line move is a new key: no TTL or background refresh needed, never stale.
+_CTX_CACHE: Dict[Tuple, Dict[str,Any]] = {}
+_CTX_CACHE_MAX = 2048
+_CTX_LOCK = threading.Lock()  # writes only; reads are single dict gets
+
+def _ctx_key(event_odds: Dict[str,Any]) -> Optional[Tuple]:
+    """(event id, start, (book, last_update)...) or None when the feed can't vouch for freshness."""
+    event_id = event_odds.get("id")
+    if not event_id: return None
+    books = []
+    for b in (event_odds.get("bookmakers") or []):
+        lu = b.get("last_update")
+        if lu is None: return None
+        books.append((b.get("key"), lu))
+    start = event_odds.get("commence_time") or event_odds.get("start_time") or event_odds.get("game_time")
+    return (event_id, start, tuple(books))
+
 def compute_totals_context(event_odds: Dict[str,Any]) -> Dict[str,Any]:
+    """
+    Memoized per event and book update (see _ctx_key); returns a fresh dict.
+    """
+    if not event_odds: return {}
+    key = _ctx_key(event_odds)
+    if key is None:
+        return _compute_totals_context(event_odds)
+    hit = _CTX_CACHE.get(key)
+    if hit is None:
+        hit = _compute_totals_context(event_odds)
+        with _CTX_LOCK:
+            if len(_CTX_CACHE) >= _CTX_CACHE_MAX:
+                _CTX_CACHE.pop(next(iter(_CTX_CACHE)), None)  # FIFO
+            _CTX_CACHE[key] = hit
+    return dict(hit)
+
+def _compute_totals_context(event_odds: Dict[str,Any]) -> Dict[str,Any]:
     """
     Returns:
       {
@@ -55,12 +93,13 @@ def compute_totals_context(event_odds: Dict[str,Any]) -> Dict[str,Any]:
     for b in bms:
         for m in (b.get("markets") or []):
             if m.get("key") == "totals":
-                over_p, under_p, point = None, None, None
-                for o in (m.get("outcomes") or []):
-                    nm, pr, pt = o.get("name"), o.get("price"), o.get("point")
-                    if nm == "Over":  over_p = american_to_prob(pr);  point = pt if pt is not None else point
-                    if nm == "Under": under_p = american_to_prob(pr); point = pt if pt is not None else point
-                if over_p is not None and under_p is not None:
+                by_name = {o.get("name"): o for o in (m.get("outcomes") or [])}
+                over_o, under_o = by_name.get("Over"), by_name.get("Under")
+                if over_o is not None and under_o is not None:
+                    over_p = american_to_prob(over_o.get("price"))
+                    under_p = american_to_prob(under_o.get("price"))
+                    point = under_o.get("point")
+                    if point is None: point = over_o.get("point")
                     p_o, p_u = no_vig_two_way(over_p, under_p)
                     if p_o and p_u:
                         over_probs.append(p_o); under_probs.append(p_u)
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Optional
 import httpx
+from mlb_http import HTTP2
 
 # ---------- MLB ----------
 async def mlb_last10(player_id: int, group: str = "hitting", season: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -12,7 +13,7 @@ async def mlb_last10(player_id: int, group: str = "hitting", season: Optional[st
     if season:
         params["season"] = season
     url = f"https://statsapi.mlb.com/api/v1/people/{player_id}/stats"
-    async with httpx.AsyncClient(timeout=15) as client:
+    async with httpx.AsyncClient(timeout=15, http2=HTTP2) as client:
         r = await client.get(url, params=params)
         r.raise_for_status()
         data = r.json()
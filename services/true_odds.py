@@ -1,6 +1,10 @@
 # services/true_odds.py
 from typing import Optional, Tuple, Dict, Any, List
 
+# one copy of the price math for every service module
+from services.odds_totals_context import (
+    american_to_prob as _american_to_prob, no_vig_two_way as _no_vig_two_way)
+
 PREFERRED_BOOKS = ["fanduel","draftkings","betmgm","caesars","pointsbetus"]
 
 MARKET_ALIASES = {
@@ -20,16 +24,6 @@ def _norm_market(m: Optional[str]) -> Optional[str]:
     if not m: return m
     return MARKET_ALIASES.get(m, m)
 
-def _american_to_prob(american: Optional[int]) -> float:
-    if american is None: return 0.0
-    a = int(american)
-    return 100.0/(a+100.0) if a>=0 else (-a)/((-a)+100.0)
-
-def _no_vig_two_way(p_a: float, p_b: float) -> Tuple[float,float]:
-    s = (p_a or 0.0) + (p_b or 0.0)
-    if s <= 0: return 0.0, 0.0
-    return p_a/s, p_b/s
-
 def _books(bms: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
     if not bms: return []
     pref = [b for b in bms if b.get("key") in PREFERRED_BOOKS]
@@ -44,37 +38,49 @@ def _same_point(prop_line, outcome_point) -> bool:
     except Exception:
         return str(prop_line) == str(outcome_point)
 
+def _true_pair(over_o: Dict[str,Any], under_o: Dict[str,Any], book: Dict[str,Any]) -> Tuple[float,float,str]:
+    p_o, p_u = _no_vig_two_way(_american_to_prob(over_o.get("price")), _american_to_prob(under_o.get("price")))
+    return round(p_o,4), round(p_u,4), book.get("key","")
+
 def true_odds(event_odds: Dict[str,Any], market_key: str, line_point) -> Tuple[float,float,str]:
     """Return (true_over, true_under, source_book) or (0,0,'') if unavailable."""
     if not event_odds: return 0.0, 0.0, ""
     target_market = _norm_market(market_key)
     bms = _books(event_odds.get("bookmakers") or [])
 
-    # Pass 1: exact line match
-    for b in bms:
-        for m in (b.get("markets") or []):
-            if m.get("key") != target_market: continue
-            over_p, under_p = None, None
-            for o in (m.get("outcomes") or []):
-                if not _same_point(line_point, o.get("point")): continue
-                nm, pr = o.get("name"), o.get("price")
-                if nm == "Over":  over_p  = _american_to_prob(pr)
-                if nm == "Under": under_p = _american_to_prob(pr)
-            if over_p is not None and under_p is not None:
-                p_o, p_u = _no_vig_two_way(over_p, under_p)
-                return round(p_o,4), round(p_u,4), b.get("key","")
+    # prop line parsed once for the inline exact-line test below; odd values
+    # (strings, missing points) still go through _same_point
+    try:
+        line_f = float(line_point) if line_point is not None else None
+    except (TypeError, ValueError):
+        line_f = None
 
-    # Pass 2: first available Over/Under for that market
+    # One pass: return the first book with an exact-line Over/Under pair;
+    # remember the first market with any Over/Under pair as the fallback.
+    fallback = None
     for b in bms:
         for m in (b.get("markets") or []):
             if m.get("key") != target_market: continue
-            over_p, under_p = None, None
+            over_x = under_x = over_a = under_a = None
             for o in (m.get("outcomes") or []):
-                nm, pr = o.get("name"), o.get("price")
-                if nm == "Over":  over_p  = _american_to_prob(pr)
-                if nm == "Under": under_p = _american_to_prob(pr)
-            if over_p is not None and under_p is not None:
-                p_o, p_u = _no_vig_two_way(over_p, under_p)
-                return round(p_o,4), round(p_u,4), b.get("key","")
+                nm = o.get("name")
+                if nm != "Over" and nm != "Under": continue
+                pt = o.get("point")
+                if line_f is not None and (pt.__class__ is float or pt.__class__ is int):
+                    hit = -1e-6 < pt - line_f < 1e-6
+                else:
+                    hit = _same_point(line_point, pt)
+                if nm == "Over":
+                    over_a = o
+                    if hit: over_x = o
+                else:
+                    under_a = o
+                    if hit: under_x = o
+            if over_x is not None and under_x is not None:
+                return _true_pair(over_x, under_x, b)
+            if fallback is None and over_a is not None and under_a is not None:
+                fallback = (over_a, under_a, b)
 
+    if fallback is not None:
+        return _true_pair(*fallback)
     return 0.0, 0.0, "" 
\ No newline at end of file
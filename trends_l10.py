@@ -1,11 +1,12 @@
 # trends_l10.py
-import re, time, unicodedata, threading
-from functools import lru_cache
-import requests
+import re, time, unicodedata, threading, asyncio, heapq
+import httpx
 from datetime import datetime
+from mlb_http import mlb_get, json_loads, HTTP2
 
 MLB_STATS_API = "https://statsapi.mlb.com/api/v1"
 STATS_TIMEOUT = 8
+L10_CONCURRENCY = 20  # in-flight statsapi requests per annotate_props_with_l10 call
 
 # log object you already use in this file
 try:
@@ -15,10 +16,13 @@ except NameError:
     LOG = logging.getLogger("trends_l10")
     LOG.setLevel(logging.INFO)
 
-# Negative cache (avoid spamming the same failing name)
+# Resolved-id caches keyed on the lowercased raw name: hits skip the variant
+# walk entirely; misses are kept briefly (avoid spamming the same failing name)
+_POS_PID: dict[str, tuple[int, float]] = {}
+_POS_TTL = 86400  # seconds
 _NEG_PID: dict[str, float] = {}
-_NEG_LOCK = threading.Lock()
 _NEG_TTL = 900  # seconds
+_PID_LOCK = threading.Lock()
 
 # Optional alias map for frequent edge cases
 _ALIAS = {
@@ -34,7 +38,11 @@ def _apply_alias(name: str) -> str:
 
 def _nfkd(s: str) -> str:
     # keep diacritics by default; only strip if you want later
-    return unicodedata.normalize("NFKD", s or "")
+    if not s:
+        return ""
+    if s.isascii():
+        return s  # ASCII is already NFKD
+    return unicodedata.normalize("NFKD", s)
 
 _SUFFIXES = {"jr", "jr.", "sr", "sr.", "ii", "iii", "iv", "v"}
 
@@ -44,20 +52,22 @@ def _strip_suffix(name: str) -> str:
         return " ".join(parts[:-1])
     return name
 
+_RE_TWO_INITS = re.compile(r"\b([A-Z])\.\s*([A-Z])\.\b")
+_RE_ONE_INIT = re.compile(r"\b([A-Z])\.\b")
+_RE_WS = re.compile(r"\s{2,}")
+
 def _initials_to_compact(name: str) -> str:
     """
     'J.P. Crawford'   -> 'JP Crawford'
     'J. P. Crawford'  -> 'JP Crawford'
     'C. J. Kayfus'    -> 'CJ Kayfus'
     """
-    n = name
     # collapse 'J. P.' or 'J.P.' to 'JP'
-    n = re.sub(r"\b([A-Z])\.\s*([A-Z])\.\b", r"\1\2", n)
+    n = _RE_TWO_INITS.sub(r"\1\2", name)
     # single dotted initial 'J.' -> 'J'
-    n = re.sub(r"\b([A-Z])\.\b", r"\1", n)
+    n = _RE_ONE_INIT.sub(r"\1", n)
     # collapse multiple spaces
-    n = re.sub(r"\s{2,}", " ", n).strip()
-    return n
+    return _RE_WS.sub(" ", n).strip()
 
 def _variants(name: str):
     """
@@ -83,28 +93,106 @@ def _variants(name: str):
     if stripped not in (base, compact, no_dots, compact_no_dots):
         yield stripped
     # 5) first + last only
-    parts = re.split(r"\s+", stripped)
+    parts = stripped.split()
     if len(parts) >= 2:
         fl = f"{parts[0]} {parts[-1]}".strip()
         if fl not in (base, compact, no_dots, compact_no_dots, stripped):
             yield fl
 
-@lru_cache(maxsize=2048)
+# Response memos shared by the sync and async paths (bounded FIFO dicts, so
+# an async batch warms the cache the sync helpers read and vice versa)
+_SEARCH_CACHE: dict[str, list] = {}
+_LOGS_CACHE: dict[tuple, list] = {}
+_MEMO_LOCK = threading.Lock()
+
+# lowercased fullName -> id for people search responses have returned, so a
+# name we've already seen resolves with one dict probe and no variant walk.
+# Only unambiguous names are indexed: a name two people share (within one
+# response or across responses) is kept as a None tombstone and never hits.
+_NAME_INDEX: dict[str, int | None] = {}
+_NAME_INDEX_MAX = 20000
+
+def _memo(cache: dict, key, value, maxsize: int):
+    with _MEMO_LOCK:
+        if len(cache) >= maxsize:
+            cache.pop(next(iter(cache)), None)
+        cache[key] = value
+    return value
+
+def _index_people(people: list[dict]) -> list[dict]:
+    ids: dict[str, set] = {}
+    for p in people:
+        full, pid = (p.get("fullName") or "").lower(), p.get("id")
+        if full and pid is not None:
+            ids.setdefault(full, set()).add(int(pid))
+    with _MEMO_LOCK:
+        for full, pids in ids.items():
+            pid = next(iter(pids)) if len(pids) == 1 else None
+            if full in _NAME_INDEX:
+                if _NAME_INDEX[full] != pid:
+                    _NAME_INDEX[full] = None  # a second person with this name
+                continue
+            if len(_NAME_INDEX) >= _NAME_INDEX_MAX:
+                _NAME_INDEX.pop(next(iter(_NAME_INDEX)), None)
+            _NAME_INDEX[full] = pid
+    return people
+
+def _search_key(names: str) -> str:
+    # people/search ignores case and spacing, so those share an entry;
+    # punctuation is kept (it's what separates the resolver's variants)
+    return " ".join(names.lower().split())
+
 def _people_search(names: str) -> list[dict]:
-    r = requests.get(f"{MLB_STATS_API}/people/search", params={"names": names}, timeout=STATS_TIMEOUT)
+    key = _search_key(names)
+    hit = _SEARCH_CACHE.get(key)
+    if hit is not None:
+        return hit
+    r = mlb_get(f"{MLB_STATS_API}/people/search", params={"names": names}, timeout=STATS_TIMEOUT)
     r.raise_for_status()
-    return (r.json() or {}).get("people", []) or []
+    people = (json_loads(r.content) or {}).get("people", []) or []
+    return _memo(_SEARCH_CACHE, key, _index_people(people), 2048)
+
+def _cached_pid(name: str, now: float) -> tuple[bool, int | None]:
+    """(True, pid) on a positive or name-index hit, (True, None) inside the negative TTL, (False, None) otherwise."""
+    key = name.lower()
+    with _PID_LOCK:
+        hit = _POS_PID.get(key)
+        if hit and now - hit[1] < _POS_TTL:
+            return True, hit[0]
+        t = _NEG_PID.get(key)
+        if t and now - t < _NEG_TTL:
+            return True, None
+    pid = _NAME_INDEX.get(key.strip())
+    if pid is not None:
+        return True, _resolved(name, pid, now)
+    return False, None
+
+def _resolved(name: str, pid: int, now: float) -> int:
+    with _PID_LOCK:
+        _POS_PID[name.lower()] = (pid, now)
+    return pid
+
+def _pick_pid(q: str, people: list[dict]) -> int | None:
+    # prefer exact case-insens match; else first
+    ln = q.lower()
+    exact = [p for p in people if (p.get("fullName") or "").lower() == ln]
+    cand = exact[0] if exact else people[0]
+    return int(cand.get("id")) if cand.get("id") is not None else None
+
+def _resolve_failed(name: str, tried: list[str], now: float) -> None:
+    LOG.warning("[L10] resolve failed (no id) %s | tried=%s", name, " | ".join(tried))
+    with _PID_LOCK:
+        _NEG_PID[name.lower()] = now
 
 def resolve_mlb_player_id(name: str) -> int | None:
     if not name:
         return None
 
-    # Negative cache guard
+    # Positive / negative cache guard
     now = time.time()
-    with _NEG_LOCK:
-        t = _NEG_PID.get(name.lower())
-        if t and now - t < _NEG_TTL:
-            return None
+    known, pid = _cached_pid(name, now)
+    if known:
+        return pid
 
     tried = []
     pid: int | None = None
@@ -118,37 +206,70 @@ def resolve_mlb_player_id(name: str) -> int | None:
             continue
         if not people:
             continue
-
-        # prefer exact case-insens match; else first
-        ln = q.lower()
-        exact = [p for p in people if (p.get("fullName") or "").lower() == ln]
-        cand = exact[0] if exact else people[0]
-        pid = int(cand.get("id")) if cand.get("id") is not None else None
+        pid = _pick_pid(q, people)
         if pid:
             break
 
     if not pid:
-        LOG.warning("[L10] resolve failed (no id) %s | tried=%s", name, " | ".join(tried))
-        with _NEG_LOCK:
-            _NEG_PID[name.lower()] = now
-    return pid
+        _resolve_failed(name, tried, now)
+        return pid
+    return _resolved(name, pid, now)
 
-@lru_cache(maxsize=4096)
 def _fetch_game_logs(person_id: int, group: str, season: int):
     """
     Returns gameLog splits list for season.
     """
+    key = (person_id, group, season)
+    hit = _LOGS_CACHE.get(key)
+    if hit is not None:
+        return hit
     url = f"{MLB_STATS_API}/people/{person_id}/stats"
     params = {"stats": "gameLog", "group": group, "season": str(season)}
-    r = requests.get(url, params=params, timeout=STATS_TIMEOUT)
+    r = mlb_get(url, params=params, timeout=STATS_TIMEOUT)
     r.raise_for_status()
-    js = r.json() or {}
+    js = json_loads(r.content) or {}
     stats = (js.get("stats") or [])
-    return stats[0].get("splits", []) if stats else []
+    return _memo(_LOGS_CACHE, key, stats[0].get("splits", []) if stats else [], 4096)
+
+def _first(pair):
+    return pair[0]
+
+# Map stat types to MLB API groups
+_STAT_GROUP = {
+    "hits": "hitting",
+    "total_bases": "hitting", 
+    "batter_hits": "hitting",
+    "batter_total_bases": "hitting",
+    "runs": "hitting",
+    "rbis": "hitting",
+    "home_runs": "hitting",
+    "strikeouts": "hitting",
+    "walks": "hitting",
+    "stolen_bases": "hitting",
+    "doubles": "hitting",
+    "triples": "hitting",
+}
+
+# stat type -> gameLog "stat" field
+_STAT_FIELD = {
+    "hits": "hits",
+    "total_bases": "totalBases",
+    "batter_hits": "hits",
+    "batter_total_bases": "totalBases",
+    "runs": "runs",
+    "rbis": "rbi",
+    "home_runs": "homeRuns",
+    "strikeouts": "strikeOuts",
+    "walks": "baseOnBalls",
+    "stolen_bases": "stolenBases",
+    "doubles": "doubles",
+    "triples": "triples",
+}
 
-def _parse_date(date_str: str) -> datetime:
-    """Parse MLB date format (2024-03-28) to datetime."""
-    return datetime.strptime(date_str, "%Y-%m-%d")
+def _years_to_try() -> list[int]:
+    # Get current year and previous year
+    current_year = datetime.now().year
+    return [current_year, current_year - 1]
 
 def get_last_10_trend(player_name: str, stat_type: str, threshold: float) -> dict:
     """
@@ -161,54 +282,36 @@ def get_last_10_trend(player_name: str, stat_type: str, threshold: float) -> dic
         # return graceful miss; no more spammy retries for 15 minutes
         return {"player_name": player_name, "games": 0, "rate_over": 0.0, "confidence": "no_id"}
 
-    # Map stat types to MLB API groups
-    stat_mapping = {
-        "hits": "hitting",
-        "total_bases": "hitting", 
-        "batter_hits": "hitting",
-        "batter_total_bases": "hitting",
-        "runs": "hitting",
-        "rbis": "hitting",
-        "home_runs": "hitting",
-        "strikeouts": "hitting",
-        "walks": "hitting",
-        "stolen_bases": "hitting",
-        "doubles": "hitting",
-        "triples": "hitting",
-    }
-    
-    group = stat_mapping.get(stat_type, "hitting")
-    
-    # Get current year and previous year
-    current_year = datetime.now().year
-    years_to_try = [current_year, current_year - 1]
-    
-    all_games = []
-    
-    for year in years_to_try:
+    group = _STAT_GROUP.get(stat_type, "hitting")
+    logs_by_year = []
+    for year in _years_to_try():
         try:
-            game_logs = _fetch_game_logs(pid, group, year)
-            for game in game_logs:
-                game_date = _parse_date(game.get("date", ""))
-                # Only include games from last 10 games (most recent first)
-                all_games.append((game_date, game))
+            logs_by_year.append(_fetch_game_logs(pid, group, year))
         except Exception as e:
             LOG.warning(f"[L10] Failed to fetch {year} logs for {player_name}: {e}")
             continue
-    
-    # Sort by date (most recent first) and take last 10
-    all_games.sort(key=lambda x: x[0], reverse=True)
-    recent_games = all_games[:10]
+        if len(logs_by_year[-1]) >= 10:
+            break  # this season alone covers the last 10; older ones can't place
+    return _l10_from_logs(player_name, stat_type, threshold, logs_by_year)
+
+def _l10_from_logs(player_name: str, stat_type: str, threshold: float, logs_by_year: list) -> dict:
+    """The L10 summary from each season's gameLog splits (network-free half of get_last_10_trend)."""
+    # Last 10 by date, most recent first. gameLog dates are ISO (YYYY-MM-DD) so
+    # they order as strings; nlargest is stable, matching the old full sort.
+    all_games = [(game.get("date", ""), game) for game_logs in logs_by_year for game in game_logs]
+    recent_games = heapq.nlargest(10, all_games, key=_first)
     
     if not recent_games:
         return {"player_name": player_name, "games": 0, "rate_over": 0.0, "confidence": "no_games"}
     
     # Count games over threshold
     over_count = 0
-    for _, game in recent_games:
-        stat_value = _extract_stat_value(game, stat_type)
-        if stat_value is not None and stat_value > threshold:
-            over_count += 1
+    field = _STAT_FIELD.get(stat_type)
+    if field:
+        for _, game in recent_games:
+            stat_value = _stat_value(game, field)
+            if stat_value is not None and stat_value > threshold:
+                over_count += 1
     
     rate_over = over_count / len(recent_games) if recent_games else 0.0
     
@@ -227,31 +330,13 @@ def get_last_10_trend(player_name: str, stat_type: str, threshold: float) -> dic
         "confidence": confidence
     }
 
-def _extract_stat_value(game: dict, stat_type: str) -> float | None:
-    """Extract stat value from game log based on stat type."""
-    stat_mapping = {
-        "hits": "hits",
-        "total_bases": "totalBases",
-        "batter_hits": "hits", 
-        "batter_total_bases": "totalBases",
-        "runs": "runs",
-        "rbis": "rbi",
-        "home_runs": "homeRuns",
-        "strikeouts": "strikeOuts",
-        "walks": "baseOnBalls",
-        "stolen_bases": "stolenBases",
-        "doubles": "doubles",
-        "triples": "triples",
-    }
-    
-    mlb_stat = stat_mapping.get(stat_type)
-    if not mlb_stat:
-        return None
-    
-    value = game.get("stat", {}).get(mlb_stat)
+def _stat_value(game: dict, field: str) -> float | None:
+    """A game's value for a _STAT_FIELD field, or None if missing/non-numeric."""
+    value = game.get("stat", {}).get(field)
     if value is None:
         return None
-    
+    if type(value) is int or type(value) is float:  # what gameLog counts almost always are
+        return float(value)
     try:
         return float(value)
     except (ValueError, TypeError):
@@ -261,13 +346,106 @@ def compute_l10(player_name: str, stat_type: str, threshold: float) -> dict:
     """Wrapper for get_last_10_trend with consistent naming."""
     return get_last_10_trend(player_name, stat_type, threshold)
 
-def annotate_props_with_l10(props_by_matchup: dict, league: str = "mlb", lookback: int = 10) -> dict:
-    """
-    Annotate props with L10 trends for MLB.
-    """
+# ---------- async bulk path ----------
+class _L10Run:
+    """One annotate call's client, concurrency bound and in-flight requests
+    (concurrent coroutines asking for the same search/log share one fetch)."""
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.sem = asyncio.Semaphore(L10_CONCURRENCY)
+        self.inflight: dict = {}
+
+    async def once(self, key, fetch):
+        fut = self.inflight.get(key)
+        if fut is None:
+            fut = self.inflight[key] = asyncio.ensure_future(fetch())
+        return await fut
+
+    async def get_json(self, url: str, params: dict):
+        async with self.sem:
+            r = await self.client.get(url, params=params)
+        r.raise_for_status()
+        return json_loads(r.content) or {}
+
+async def _apeople_search(run: _L10Run, names: str) -> list[dict]:
+    key = _search_key(names)
+    hit = _SEARCH_CACHE.get(key)
+    if hit is not None:
+        return hit
+    async def fetch():
+        js = await run.get_json(f"{MLB_STATS_API}/people/search", {"names": names})
+        return _memo(_SEARCH_CACHE, key, _index_people(js.get("people", []) or []), 2048)
+    return await run.once(("search", key), fetch)
+
+async def _aresolve_mlb_player_id(run: _L10Run, name: str) -> int | None:
+    """Async twin of resolve_mlb_player_id (same caches, same variant order)."""
+    if not name:
+        return None
+    now = time.time()
+    known, pid = _cached_pid(name, now)
+    if known:
+        return pid
+    tried = []
+    for q in _variants(name):
+        tried.append(q)
+        try:
+            people = await _apeople_search(run, q)
+        except Exception as e:
+            LOG.warning("[L10] people/search failed '%s': %s", q, e)
+            continue
+        if people:
+            pid = _pick_pid(q, people)
+            if pid:
+                return _resolved(name, pid, now)
+    _resolve_failed(name, tried, now)
+    return None
+
+async def _afetch_game_logs(run: _L10Run, person_id: int, group: str, season: int):
+    key = (person_id, group, season)
+    hit = _LOGS_CACHE.get(key)
+    if hit is not None:
+        return hit
+    async def fetch():
+        js = await run.get_json(f"{MLB_STATS_API}/people/{person_id}/stats",
+                                {"stats": "gameLog", "group": group, "season": str(season)})
+        stats = (js.get("stats") or [])
+        return _memo(_LOGS_CACHE, key, stats[0].get("splits", []) if stats else [], 4096)
+    return await run.once(("logs",) + key, fetch)
+
+async def compute_l10_async(run: _L10Run, player_name: str, stat_type: str, threshold: float) -> dict:
+    """compute_l10 on the async path: id resolution, then seasons newest-first until 10 games."""
+    pid = await run.once(("pid", player_name), lambda: _aresolve_mlb_player_id(run, player_name))
+    if not pid:
+        return {"player_name": player_name, "games": 0, "rate_over": 0.0, "confidence": "no_id"}
+    group = _STAT_GROUP.get(stat_type, "hitting")
+    logs_by_year = []
+    for year in _years_to_try():
+        try:
+            logs_by_year.append(await _afetch_game_logs(run, pid, group, year))
+        except Exception as e:
+            LOG.warning(f"[L10] Failed to fetch {year} logs for {player_name}: {e}")
+            continue
+        if len(logs_by_year[-1]) >= 10:
+            break  # same early stop as get_last_10_trend
+    return _l10_from_logs(player_name, stat_type, threshold, logs_by_year)
+
+async def annotate_props_with_l10_async(props_by_matchup: dict, league: str = "mlb", lookback: int = 10) -> dict:
+    """annotate_props_with_l10 with every player's lookups in flight together."""
     if league.lower() != "mlb":
         return props_by_matchup
-    
+    todo = _l10_todo(props_by_matchup)
+    limits = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+    async with httpx.AsyncClient(http2=HTTP2, limits=limits, timeout=STATS_TIMEOUT) as client:
+        run = _L10Run(client)
+        keys = list(dict.fromkeys(key for key, _ in todo))
+        results = await asyncio.gather(*[compute_l10_async(run, *key) for key in keys],
+                                       return_exceptions=True)
+    _attach_l10(todo, dict(zip(keys, results)))
+    return props_by_matchup
+
+def _l10_todo(props_by_matchup: dict) -> list:
+    """[((player, stat, line), prop)] for every prop that can carry an L10 trend."""
+    todo = []
     for matchup, props in props_by_matchup.items():
         for prop in props:
             player_name = prop.get("player", "")
@@ -276,11 +454,40 @@ def annotate_props_with_l10(props_by_matchup: dict, league: str = "mlb", lookbac
             
             if player_name and stat_type and line is not None:
                 try:
-                    trend = compute_l10(player_name, stat_type, float(line))
-                    prop["meta"] = prop.get("meta", {})
-                    prop["meta"]["l10"] = trend
+                    todo.append(((player_name, stat_type, float(line)), prop))
                 except Exception as e:
                     LOG.warning(f"[L10] Failed to compute trend for {player_name} {stat_type}: {e}")
-                    continue
-    
+    return todo
+
+def _attach_l10(todo: list, trends: dict) -> None:
+    for key, prop in todo:
+        trend = trends.get(key)
+        if isinstance(trend, Exception):
+            LOG.warning(f"[L10] Failed to compute trend for {key[0]} {key[1]}: {trend}")
+            continue
+        prop["meta"] = prop.get("meta", {})
+        prop["meta"]["l10"] = trend
+
+def annotate_props_with_l10(props_by_matchup: dict, league: str = "mlb", lookback: int = 10) -> dict:
+    """
+    Annotate props with L10 trends for MLB.
+    Lookups run concurrently (annotate_props_with_l10_async); inside a running
+    event loop this falls back to the serial path.
+    """
+    if league.lower() != "mlb":
+        return props_by_matchup
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(annotate_props_with_l10_async(props_by_matchup, league, lookback))
+
+    todo = _l10_todo(props_by_matchup)
+    trends = {}
+    for key, _ in todo:
+        if key not in trends:
+            try:
+                trends[key] = compute_l10(*key)
+            except Exception as e:
+                trends[key] = e
+    _attach_l10(todo, trends)
     return props_by_matchup
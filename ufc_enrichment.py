@@ -1,27 +1,92 @@
 # ufc_enrichment.py
 from __future__ import annotations
-import json, os
-from typing import Dict, Any
+import json, os, sqlite3, threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson else json.loads
 
 _DB_PATH = os.getenv("UFC_BIO_JSON", "ufc_fighters.json")
+# Prebuilt index (build_bio_db): when present, bios are read per lookup from
+# sqlite instead of parsing the whole JSON into every worker at import.
+_SQLITE_PATH = os.getenv("UFC_BIO_DB", "ufc_fighters.db")
+_tls = threading.local()
 
-def _load() -> Dict[str, Any]:
-    if os.path.exists(_DB_PATH):
+def _connect_ro() -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{_SQLITE_PATH}?mode=ro", uri=True)
+
+def _has_bios_table() -> bool:
+    """True only for a readable db that has the bios table (stale/corrupt files fall back to JSON)."""
+    if not os.path.exists(_SQLITE_PATH):
+        return False
+    try:
+        conn = _connect_ro()
         try:
-            with open(_DB_PATH, "r") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bios'").fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+_USE_SQLITE = _has_bios_table()
+
+def _load() -> Dict[str, Any]:
+    if _USE_SQLITE:
+        return {}
+    try:
+        return _json_loads(Path(_DB_PATH).read_bytes())
+    except (OSError, ValueError):  # missing/unreadable file or bad JSON
+        return {}
 
 _BIO = _load()
 
+# Case-insensitive index, built once; setdefault keeps the first key when two
+# differ only by case, as the old linear scan did.
+_BIO_LC: Dict[str, Dict[str, Any]] = {}
+for _k, _v in _BIO.items():
+    _BIO_LC.setdefault(_k.lower(), _v)
+
+def build_bio_db(json_path: str = _DB_PATH, db_path: str = _SQLITE_PATH) -> int:
+    """Write the JSON bios to a sqlite table keyed on lowercased name; returns rows written."""
+    bios = _json_loads(Path(json_path).read_bytes())
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS bios")
+            conn.execute("CREATE TABLE bios (name TEXT PRIMARY KEY, bio TEXT NOT NULL)")
+            # OR IGNORE: first key wins on case-only duplicates, as in _BIO_LC
+            conn.executemany("INSERT OR IGNORE INTO bios VALUES (?, ?)",
+                             ((k.lower(), json.dumps(v)) for k, v in bios.items()))
+        return conn.execute("SELECT COUNT(*) FROM bios").fetchone()[0]
+    finally:
+        conn.close()
+
+def _sqlite_bio(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        conn = getattr(_tls, "conn", None)
+        if conn is None:  # one read-only connection per thread
+            conn = _tls.conn = _connect_ro()
+        row = conn.execute("SELECT bio FROM bios WHERE name = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+    except (sqlite3.Error, ValueError):  # db replaced/broken underneath us: default bio
+        return None
+
 def lookup_bio(name: str) -> Dict[str, Any]:
-    for k, v in _BIO.items():
-        if k.lower() == (name or "").lower():
-            return {
-                "reach": v.get("reach"), "age": v.get("age"),
-                "camp": v.get("camp"), "recent_form": v.get("recent_form"),
-                "short_notice": bool(v.get("short_notice", False))
-            }
+    key = (name or "").lower()
+    v = _sqlite_bio(key) if _USE_SQLITE else _BIO_LC.get(key)
+    if v is not None:
+        return {
+            "reach": v.get("reach"), "age": v.get("age"),
+            "camp": v.get("camp"), "recent_form": v.get("recent_form"),
+            "short_notice": bool(v.get("short_notice", False))
+        }
     return {"reach": None, "age": None, "camp": None, "recent_form": None, "short_notice": False}
+
+if __name__ == "__main__":
+    print(f"wrote {build_bio_db()} bios to {_SQLITE_PATH}")
@@ -1,5 +1,5 @@
 # universal_cache.py
-import os, json, time
+import os, json, time, threading
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional, Dict, Callable
 try:
@@ -7,20 +7,69 @@ try:
 except Exception:
     ZoneInfo = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 PHX_TZ = ZoneInfo("America/Phoenix") if ZoneInfo else None
 
+if orjson:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY  # match json.dumps' key coercion
+
+    def _dumps(value: Any):
+        try:
+            return orjson.dumps(value, option=_ORJSON_OPTS)
+        except TypeError:
+            return json.dumps(value)  # types orjson refuses (e.g. float subclasses)
+    _loads = orjson.loads
+else:
+    _dumps, _loads = json.dumps, json.loads
+
 # Optional Redis
 REDIS_URL = os.getenv("REDIS_URL", "")
 _redis = None
 if REDIS_URL:
     try:
         import redis
-        _redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        _redis = redis.Redis.from_url(REDIS_URL)  # raw bytes; both loaders take bytes
     except Exception:
         _redis = None
 
-# In-proc fallback
-_mem: Dict[str, Dict[str, Any]] = {}
+class ExpiringMemo:
+    """
+    In-process key -> (value, expiry) memo: bounded (FIFO past maxsize) and
+    swept of expired entries at most every sweep_s seconds on write, so dead
+    keys don't pile up in a long-running worker. Reads are lock-free dict gets.
+    """
+    def __init__(self, maxsize: int = 4096, sweep_s: float = 60):
+        self.maxsize, self.sweep_s = maxsize, sweep_s
+        self._d: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def get(self, key: Any, now: Optional[float] = None) -> Optional[tuple]:
+        """The live (value, expiry) pair for key, else None (value itself may be None)."""
+        hit = self._d.get(key)
+        if hit is not None and hit[1] > (time.time() if now is None else now):
+            return hit
+        return None
+
+    def put(self, key: Any, value: Any, exp: float) -> Any:
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                for k in [k for k, rec in self._d.items() if rec[1] <= now]:
+                    del self._d[k]
+                self._next_sweep = now + self.sweep_s
+            self._d.pop(key, None)  # re-insert as newest
+            while len(self._d) >= self.maxsize:
+                self._d.pop(next(iter(self._d)))
+            self._d[key] = (value, exp)
+        return value
+
+# In-proc fallback when there's no Redis
+_mem = ExpiringMemo(int(os.getenv("CACHE_MEM_MAX", "4096")))
 
 CACHE_PREFIX = os.getenv("CACHE_PREFIX", "")
 CACHE_VERSION = os.getenv("CACHE_VERSION", "v1")  # bump to invalidate
@@ -64,26 +113,83 @@ def slot_key(namespace: str, league: str, suffix: str = "") -> str:
 def get_json(key: str) -> Optional[Any]:
     if _redis:
         raw = _redis.get(key)
-        return json.loads(raw) if raw else None
+        return _loads(raw) if raw else None
     rec = _mem.get(key)
-    if rec and rec["exp"] > time.time():
-        return json.loads(rec["val"])
-    return None
+    return _loads(rec[0]) if rec is not None else None
 
-def set_json(key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+def set_json(key: str, value: Any = None, ttl_seconds: Optional[int] = None, persist: bool = False,
+             raw: Optional[bytes | str] = None) -> None:
+    """
+    persist=True stores without expiry (for facts that never change, e.g. mlb:pid:*).
+    raw: an already-serialized JSON body (e.g. an upstream response's bytes),
+    stored as-is instead of re-encoding value.
+    """
+    if raw is None:
+        raw = _dumps(value)
+    if persist:
+        if _redis:
+            _redis.set(key, raw)
+        else:
+            _mem.put(key, raw, float("inf"))
+        return
     _, next_b = current_slot()
     ttl = ttl_seconds if ttl_seconds is not None else _ttl_to_next_boundary(next_b)
-    raw = json.dumps(value)
     if _redis:
         _redis.setex(key, ttl, raw)
     else:
-        _mem[key] = {"exp": time.time() + ttl, "val": raw}
+        _mem.put(key, raw, time.time() + ttl)
+
+def get_json_many(keys: list[str]) -> Dict[str, Any]:
+    """get_json for several keys in one Redis MGET; misses are left out."""
+    if not keys:
+        return {}
+    if _redis:
+        return {k: _loads(raw) for k, raw in zip(keys, _redis.mget(keys)) if raw}
+    now = time.time()
+    out = {}
+    for k in keys:
+        rec = _mem.get(k, now)
+        if rec is not None:
+            out[k] = _loads(rec[0])
+    return out
+
+def set_json_many(items: Dict[str, Any], ttl_seconds: Optional[int] = None) -> None:
+    """set_json for several keys sharing one TTL, pipelined into one Redis round trip."""
+    if not items:
+        return
+    _, next_b = current_slot()
+    ttl = ttl_seconds if ttl_seconds is not None else _ttl_to_next_boundary(next_b)
+    if _redis:
+        pipe = _redis.pipeline(transaction=False)
+        for k, v in items.items():
+            pipe.setex(k, ttl, _dumps(v))
+        pipe.execute()
+        return
+    exp = time.time() + ttl
+    for k, v in items.items():
+        _mem.put(k, _dumps(v), exp)
+
+# Per-key fill locks: on a slot rollover only one caller runs fetcher(), the
+# rest wait and read what it cached.
+_key_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
 
 def get_or_set_slot(namespace: str, league: str, fetcher: Callable[[], Any], suffix: str = "") -> Any:
     k = slot_key(namespace, league, suffix=suffix)
     cached = get_json(k)
     if cached is not None:
         return cached
-    data = fetcher()
-    set_json(k, data)
-    return data
+    with _locks_guard:
+        lock = _key_locks.setdefault(k, threading.Lock())
+    with lock:
+        try:
+            cached = get_json(k)
+            if cached is not None:
+                return cached
+            data = fetcher()
+            set_json(k, data)
+            return data
+        finally:
+            with _locks_guard:
+                if _key_locks.get(k) is lock:
+                    del _key_locks[k]